@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Size and load time of what `views.get_styleguide` keeps in the cache: the
+pickled `Styleguide` it used to store against `Styleguide.to_manifest()`.
+
+    python benchmarks/cache_payload.py [modules] [components_per_module]
+"""
+
+import pickle
+import shutil
+import sys
+import tempfile
+
+from common import setup_django, create_tree, get_loader, best_of, report
+
+setup_django()
+
+from styleguide.utils import Styleguide, StyleguideLoader  # noqa
+
+
+def main(modules=50, components=40):
+    tmp_dir = tempfile.mkdtemp()
+
+    try:
+        loader = get_loader([create_tree(tmp_dir, modules, components)])
+
+        # The manifest is built from the styleguide which scanned the tree,
+        # as the views do
+        scanned = Styleguide()
+        scanned._loader = loader
+        manifest = scanned.to_manifest()
+
+        styleguide = Styleguide()
+        styleguide._loader = loader
+        styleguide.modules
+        # a loader which can be pickled, as the views cached it
+        styleguide._loader = StyleguideLoader()
+
+        protocol = pickle.HIGHEST_PROTOCOL
+        before = pickle.dumps(styleguide, protocol)
+        after = pickle.dumps(manifest, protocol)
+
+        load_before = best_of(lambda: pickle.loads(before), number=10)
+        load_after = best_of(
+            lambda: Styleguide.from_manifest(pickle.loads(after)), number=10)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    report('cache payload, %s modules x %s components' % (modules,
+                                                           components), [
+        ('pickled Styleguide', '%.1f KB, loaded in %.2f ms' % (
+            len(before) / 1024.0, load_before * 1e3)),
+        ('manifest', '%.1f KB, loaded in %.2f ms' % (
+            len(after) / 1024.0, load_after * 1e3)),
+    ])
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Time a warm `views.get_styleguide` spends on the cache: reading the whole
+manifest from the django cache against reading the generation stamp and
+copying the styleguide this process already has.
+
+    python benchmarks/cache_tiers.py [modules] [components_per_module]
+"""
+
+import shutil
+import sys
+import tempfile
+
+from common import setup_django, create_tree, get_loader, best_of, report
+
+setup_django()
+
+from django.core.cache import cache  # noqa
+from styleguide.cache import StyleguideCache  # noqa
+from styleguide.utils import Styleguide, STYLEGUIDE_CACHE_KEY  # noqa
+
+
+def main(modules=50, components=40):
+    tmp_dir = tempfile.mkdtemp()
+
+    try:
+        styleguide = Styleguide()
+        styleguide._loader = get_loader([create_tree(tmp_dir, modules,
+                                                     components)])
+        styleguide_cache = StyleguideCache()
+        styleguide_cache.set(styleguide.to_manifest())
+
+        shared = best_of(lambda: Styleguide.from_manifest(
+            cache.get(STYLEGUIDE_CACHE_KEY)), number=10)
+        local = best_of(lambda: styleguide_cache.get(None), number=10)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    report('warm cache, %s modules x %s components' % (modules, components), [
+        ('django cache only', '%.3f ms' % (shared * 1e3)),
+        ('process copy', '%.3f ms' % (local * 1e3)),
+    ])
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers shared by the benchmark scripts.
+
+The scripts are meant to be run from the project root, like `manage.py`:
+
+    python benchmarks/<script>.py
+"""
+
+import os
+import sys
+import timeit
+import warnings
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def setup_django(template_dirs=()):
+    """
+    Configures django with the test settings used by `manage.py`
+
+    :template_dirs: Extra template folders, so the views and templates see
+    a synthetic tree
+    """
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_settings')
+
+    from django.conf import settings
+    if template_dirs:
+        settings.TEMPLATE_DIRS = tuple(settings.TEMPLATE_DIRS) + \
+            tuple(template_dirs)
+        settings.TEMPLATES[0]['DIRS'] = settings.TEMPLATE_DIRS
+
+    import django
+    django.setup()
+
+    # django.setup() turns the deprecation warnings on
+    warnings.simplefilter('ignore', DeprecationWarning)
+    warnings.simplefilter('ignore', PendingDeprecationWarning)
+
+
+COMPONENT_TEMPLATE = """
+{%% comment %%}
+@doc
+
+@name %(name)s
+@description
+  %(description)s
+{%% endcomment %%}
+
+<div class="%(name)s">
+    {%% for item in items %%}<span>{{ item }}</span>{%% endfor %%}
+</div>
+"""
+
+EXAMPLE_TAG = """
+@example
+  <div class="%(name)s">
+    <span>item</span>
+  </div>
+"""
+
+
+def create_tree(path, modules=10, components=10, depth=0, first_module=0):
+    """
+    Creates a styleguide folder with `modules` folders holding
+    `components` templates each, plus a doc file per module.
+
+    :depth: With a depth, components are spread from the module folder
+    down to `depth` levels of sub folders
+    :first_module: The number of the first module, so trees created in
+    different template folders do not share modules
+
+    -> string, the path of the styleguide folder
+    """
+    styleguide_dir = os.path.join(path, 'styleguide')
+
+    for module_index in range(first_module, first_module + modules):
+        module_dir = os.path.join(styleguide_dir, 'module_%04d' % module_index)
+        os.makedirs(module_dir)
+
+        with open(os.path.join(module_dir, '__doc__.html'), 'w') as docfile:
+            docfile.write('@description module %s' % module_index)
+
+        for index in range(components):
+            name = 'component_%04d' % index
+            level = index % (depth + 1)
+            folder = os.path.join(module_dir, *['sub_%s' % sub_level
+                                                for sub_level
+                                                in range(1, level + 1)])
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+
+            description = 'lorem ipsum ' * (index % 30 + 1)
+            if index % 3 == 0:
+                # doc headers of different sizes
+                description += EXAMPLE_TAG % {'name': name} * (index % 5)
+
+            with open(os.path.join(folder, '%s.html' % name), 'w') as f:
+                f.write(COMPONENT_TEMPLATE % {
+                    'name': name,
+                    'description': description,
+                })
+
+    return styleguide_dir
+
+
+def create_template_dirs(path, modules=10, components=10, depth=0,
+                         template_dirs=1):
+    """
+    Creates `template_dirs` template folders, sharing the modules between
+    them, each with its own styleguide folder
+    -> list of the template folders
+    """
+    folders = []
+    modules_per_dir = max(1, modules // template_dirs)
+
+    for index in range(template_dirs):
+        folder = os.path.join(path, 'templates_%s' % index)
+        first_module = index * modules_per_dir
+        count = modules_per_dir
+        if index == template_dirs - 1:
+            count = max(0, modules - first_module)
+
+        create_tree(folder, count, components, depth, first_module)
+        folders.append(folder)
+
+    return folders
+
+
+def get_loader(template_dirs, **kwargs):
+    """Returns a `StyleguideLoader` which scans only the given folders"""
+    from styleguide.utils import StyleguideLoader
+
+    loader = StyleguideLoader(**kwargs)
+    loader._get_template_dirs = lambda: tuple(template_dirs)
+    return loader
+
+
+def best_of(func, repeat=5, number=1):
+    """Returns the best time, in seconds, of `repeat` runs of `func`"""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+def report(title, rows):
+    """
+    Prints a simple table.
+    :rows: list of (label, value) tuples
+    """
+    print(title)
+    print('-' * len(title))
+    width = max(len(label) for label, value in rows)
+    for label, value in rows:
+        print('%s  %s' % (label.ljust(width), value))
+    print('')
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Per-file cost of extracting the `{% comment %}` doc header of a component.
+
+Compares the former Lexer + Parser based extraction against reading the
+file and running `StyleguideLoader.extract_doc` on it, as the scan does.
+
+    python benchmarks/extract_doc.py [number_of_files]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+from common import setup_django, best_of, report
+
+setup_django()
+
+from django.template.base import Lexer, Parser  # noqa
+from django.template.defaulttags import CommentNode  # noqa
+from django.template.engine import Engine  # noqa
+
+from styleguide.utils import StyleguideLoader  # noqa
+
+
+DOC_HEADER = """
+{%% comment %%}
+@doc
+
+@name component %(index)s
+@description
+  %(description)s
+{%% endcomment %%}
+"""
+
+BODY = """
+<div class="component-%(index)s">
+    {%% if items %%}
+        {%% for item in items %%}<span>{{ item }}</span>{%% endfor %%}
+    {%% endif %%}
+</div>
+"""
+
+
+def parser_extract_doc_from_file(file_path):
+    """The Lexer + Parser extraction, as it was before the doc extractor"""
+    file_contents = open(file_path).read()
+    lexer = Lexer(file_contents)
+    tokens = lexer.tokenize()
+    engine = Engine.get_default()
+    parser = Parser(lexer.tokenize(), engine.template_libraries,
+                    engine.template_builtins, origin=None)
+
+    index = 0
+    result = ""
+
+    for node in parser.parse():
+        if isinstance(node, CommentNode):
+            result = tokens[index+1].contents.strip()
+            break
+
+        index += 1
+
+    return result
+
+
+def create_files(path, number_of_files):
+    file_paths = []
+    for index in range(number_of_files):
+        context = {
+            'index': index,
+            'description': 'lorem ipsum dolor sit amet ' * (index % 20 + 1),
+        }
+        file_path = os.path.join(path, '%04d.html' % index)
+        with open(file_path, 'w') as template:
+            template.write(DOC_HEADER % context)
+            template.write(BODY % context * (index % 50 + 1))
+
+        file_paths.append(file_path)
+
+    return file_paths
+
+
+def main(number_of_files=500):
+    loader = StyleguideLoader()
+    tmp_dir = tempfile.mkdtemp()
+
+    try:
+        file_paths = create_files(tmp_dir, number_of_files)
+
+        def extract_doc_from_file(file_path):
+            return loader.extract_doc(loader._read_file(file_path))
+
+        for file_path in file_paths:
+            expected = parser_extract_doc_from_file(file_path)
+            assert extract_doc_from_file(file_path) == expected
+
+        def run_parser():
+            for file_path in file_paths:
+                parser_extract_doc_from_file(file_path)
+
+        def run_extractor():
+            for file_path in file_paths:
+                extract_doc_from_file(file_path)
+
+        before = best_of(run_parser) / number_of_files
+        after = best_of(run_extractor) / number_of_files
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    report('extract_doc (%s files)' % number_of_files, [
+        ('Lexer + Parser', '%.1f us/file' % (before * 1e6)),
+        ('doc extractor', '%.1f us/file' % (after * 1e6)),
+        ('speedup', '%.1fx' % (before / after)),
+    ])
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
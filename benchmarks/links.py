@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Cost of building component links: `reverse` per component, as the loader
+used to do, against `LinkBuilder`.
+
+    python benchmarks/links.py [number_of_components]
+"""
+
+import sys
+
+from common import setup_django, best_of, report
+
+setup_django()
+
+from django.core.urlresolvers import reverse  # noqa
+
+from styleguide.utils import LinkBuilder  # noqa
+
+
+def main(number_of_components=10000):
+    ids = [('module_%s' % (index // 50), 'component_%s' % index)
+           for index in range(number_of_components)]
+
+    def run_reverse():
+        for module_id, component_id in ids:
+            url = reverse("styleguide.component",
+                          args=(module_id, component_id))
+            url.replace('%23', '#')
+
+    def run_builder():
+        links = LinkBuilder()
+        for module_id, component_id in ids:
+            links.get_component_link(module_id, component_id)
+
+    before = best_of(run_reverse)
+    after = best_of(run_builder)
+
+    report('component links (%s components)' % number_of_components, [
+        ('reverse', '%.2f us/link' % (before / number_of_components * 1e6)),
+        ('LinkBuilder', '%.2f us/link' % (after / number_of_components * 1e6)),
+        ('speedup', '%.1fx' % (before / after)),
+    ])
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
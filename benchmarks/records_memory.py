@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Memory held by 10k components: the former dict based `StyleguideComponent`
+against the `__slots__` records. Needs python 3 for tracemalloc.
+
+    python benchmarks/records_memory.py [number_of_components]
+"""
+
+import gc
+import sys
+
+from common import setup_django, report
+
+setup_django()
+
+from styleguide.utils import StyleguideComponent  # noqa
+
+
+class DictStyleguideComponent(dict):
+    """ StyleguideComponent as it was before the records """
+
+    def __init__(self, data):
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+    @property
+    def name(self):
+        return self._data['name']
+
+
+def create_components(component_class, number_of_components):
+    """ Only the components are kept, like `Styleguide.modules` does """
+    return [component_class({
+        'id': 'component-%s' % index,
+        'name': 'component %s' % index,
+        'file_name': 'component_%s.html' % index,
+        'template': 'styleguide/module/component_%s.html' % index,
+        'doc': {'description': 'a component'},
+        'link': '/styleguide/module#component-%s' % index,
+    }) for index in range(number_of_components)]
+
+
+def measure(component_class, number_of_components):
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    components = create_components(component_class, number_of_components)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert components[-1].name
+    return size
+
+
+def main(number_of_components=10000):
+    try:
+        import tracemalloc  # noqa
+    except ImportError:
+        print('tracemalloc is needed, run it with python 3')
+        return
+
+    before = measure(DictStyleguideComponent, number_of_components)
+    after = measure(StyleguideComponent, number_of_components)
+
+    report('memory of %s components' % number_of_components, [
+        ('dict subclass', '%.1f KB, %s bytes/component' % (
+            before / 1024.0, before // number_of_components)),
+        ('slots record', '%.1f KB, %s bytes/component' % (
+            after / 1024.0, after // number_of_components)),
+        ('saved', '%.0f%%' % (100.0 - after * 100.0 / before)),
+    ])
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Cold scan and fingerprint time of a styleguide folder which also holds a
+large build output folder, with and without `STYLEGUIDE_EXCLUDE` pruning it.
+
+    python benchmarks/scan_pruning.py [modules] [components] [build_files]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+from common import setup_django, create_tree, get_loader, best_of, report
+
+setup_django()
+
+from styleguide.paths import PathFilter  # noqa
+
+
+def create_build_output(styleguide_dir, files):
+    """ A `node_modules` folder in the first module, 50 files per folder """
+    module_dir = sorted(os.listdir(styleguide_dir))[0]
+    root = os.path.join(styleguide_dir, module_dir, 'node_modules')
+
+    for index in range(files):
+        folder = os.path.join(root, 'package_%04d' % (index // 50))
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+
+        extension = '.html' if index % 10 == 0 else '.js'
+        with open(os.path.join(folder, 'file_%s%s' % (index, extension)),
+                  'w') as build_file:
+            build_file.write('x' * 200)
+
+
+def main(modules=20, components=20, build_files=20000):
+    tmp_dir = tempfile.mkdtemp()
+
+    try:
+        template_dirs = [create_tree(tmp_dir, modules, components)]
+        create_build_output(template_dirs[0], build_files)
+        rows = []
+
+        for label, path_filter in (
+                ('no pattern', PathFilter()),
+                ('exclude node_modules',
+                 PathFilter(exclude=('node_modules', )))):
+            scan = best_of(
+                lambda: get_loader(template_dirs, path_filter=path_filter)
+                .get_styleguide_components(),
+                repeat=3)
+            fingerprint = best_of(
+                lambda: get_loader(template_dirs, path_filter=path_filter)
+                .get_fingerprint(),
+                repeat=3)
+            rows.append(('%s, scan' % label, '%.1f ms' % (scan * 1e3)))
+            rows.append(('%s, fingerprint' % label,
+                         '%.1f ms' % (fingerprint * 1e3)))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    report('%s modules x %s components, %s build files' % (
+        modules, components, build_files), rows)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Cold scan time of `StyleguideLoader.get_styleguide_components` by number of
+workers (the `STYLEGUIDE_SCAN_WORKERS` setting), on a synthetic tree.
+
+    python benchmarks/scan_workers.py [modules] [components_per_module]
+"""
+
+import shutil
+import sys
+import tempfile
+
+from common import setup_django, create_tree, get_loader, best_of, report
+
+setup_django()
+
+
+def main(modules=50, components=40):
+    tmp_dir = tempfile.mkdtemp()
+
+    try:
+        template_dirs = [create_tree(tmp_dir, modules, components)]
+        rows = []
+
+        serial = best_of(
+            lambda: get_loader(template_dirs).get_styleguide_components(),
+            repeat=3)
+        rows.append(('serial', '%.1f ms' % (serial * 1e3)))
+
+        for executor in ('thread', 'process'):
+            for workers in (2, 4, 8):
+                loader_kwargs = {'workers': workers, 'executor': executor}
+                elapsed = best_of(
+                    lambda: get_loader(template_dirs, **loader_kwargs)
+                    .get_styleguide_components(),
+                    repeat=3)
+                rows.append(('%s x %s' % (executor, workers),
+                             '%.1f ms (%.2fx)' % (elapsed * 1e3,
+                                                  serial / elapsed)))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    report('get_styleguide_components, %s modules x %s components' % (
+        modules, components), rows)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
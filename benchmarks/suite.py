@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks the styleguide on a synthetic tree and writes the results to a
+json file, so runs of different versions can be compared.
+
+    python benchmarks/suite.py --modules 100 --components 50 \\
+        --depth 2 --template-dirs 3 --output results.json
+
+    python benchmarks/suite.py --compare results.json
+"""
+
+import argparse
+import copy
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import timeit
+
+from common import PROJECT_ROOT, setup_django, create_template_dirs, report
+
+
+class User(object):
+    is_staff = True
+    is_superuser = False
+
+    def is_authenticated(self):
+        return True
+
+
+def measure(func, repeat, setup=None):
+    """ -> dict with the best and mean seconds of `repeat` runs """
+    runs = []
+    for index in range(repeat):
+        if setup is not None:
+            setup()
+
+        start = timeit.default_timer()
+        func()
+        runs.append(timeit.default_timer() - start)
+
+    return {'best': min(runs), 'mean': sum(runs) / len(runs),
+            'runs': len(runs)}
+
+
+def get_commit():
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                         cwd=PROJECT_ROOT,
+                                         stderr=subprocess.STDOUT)
+        return output.decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    import django
+    from django.core.cache import cache
+    from django.template.loader import render_to_string
+    from django.test import RequestFactory
+
+    from styleguide import views
+    from styleguide.fragments import fragment_cache
+    from styleguide.utils import Styleguide, StyleguideLoader
+
+    # The production code path: the cache is used
+    views.STYLEGUIDE_DEBUG = False
+    views.STYLEGUIDE_DEBUG_FINGERPRINT = False
+
+    request = RequestFactory().get('/')
+    request.user = User()
+    repeat = options.repeat
+
+    def clear_caches():
+        cache.clear()
+        fragment_cache.clear()
+
+    styleguide = Styleguide()
+    styleguide.modules
+
+    def render_modules():
+        for module in styleguide.modules:
+            context = views.get_module_context(copy.copy(styleguide),
+                                               module.name)
+            render_to_string(views.MODULE_TEMPLATE, context)
+
+    results = {}
+    results['loader.get_styleguide_components'] = measure(
+        lambda: StyleguideLoader().get_styleguide_components(), repeat)
+    results['Styleguide.modules'] = measure(
+        lambda: Styleguide().modules, repeat)
+    results['views.index cold'] = measure(
+        lambda: views.index(request), repeat, setup=clear_caches)
+
+    views.index(request)
+    results['views.index warm'] = measure(lambda: views.index(request),
+                                          repeat)
+    results['render index.html'] = measure(
+        lambda: render_to_string(views.INDEX_TEMPLATE,
+                                 {'styleguide': styleguide}), repeat)
+    results['render module pages cold'] = measure(
+        render_modules, repeat, setup=clear_caches)
+
+    render_modules()
+    results['render module pages warm'] = measure(render_modules, repeat)
+
+    return {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'tree': {
+            'modules': options.modules,
+            'components': options.components,
+            'depth': options.depth,
+            'template_dirs': options.template_dirs,
+            'total_components': len(styleguide.components),
+        },
+        'results': results,
+    }
+
+
+def print_results(data, previous=None):
+    rows = []
+    for name in sorted(data['results']):
+        best = data['results'][name]['best']
+        row = '%10.2f ms' % (best * 1e3)
+
+        if previous is not None and name in previous['results']:
+            before = previous['results'][name]['best']
+            row += '  (was %.2f ms, %+.0f%%)' % (
+                before * 1e3, (best - before) * 100.0 / before)
+
+        rows.append((name, row))
+
+    tree = data['tree']
+    report('%s modules x %s components, depth %s, %s template dirs '
+           '(best of %s)' % (tree['modules'], tree['components'],
+                             tree['depth'], tree['template_dirs'],
+                             data['results'][name]['runs']), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--modules', type=int, default=50)
+    parser.add_argument('--components', type=int, default=20,
+                        help="Components per module")
+    parser.add_argument('--depth', type=int, default=1,
+                        help="Levels of sub folders inside the modules")
+    parser.add_argument('--template-dirs', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='benchmark-results.json',
+                        help="Where to write the results")
+    parser.add_argument('--compare',
+                        help="Results of a previous run to compare with")
+    options = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        template_dirs = create_template_dirs(
+            tmp_dir, options.modules, options.components, options.depth,
+            options.template_dirs)
+        setup_django(template_dirs)
+        data = run(options)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    previous = None
+    if options.compare:
+        with open(options.compare) as results_file:
+            previous = json.load(results_file)
+
+    print_results(data, previous)
+
+    with open(options.output, 'w') as results_file:
+        json.dump(data, results_file, indent=2, sort_keys=True)
+    print('Results written to %s' % options.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+class StyleguideConfig(AppConfig):
+    name = 'styleguide'
+    verbose_name = 'Styleguide'
+
+    def ready(self):
+        # The styleguide modules read their settings when imported, so they
+        # are only imported when a feature needs them
+        if self._is_reloader_parent():
+            return
+
+        if getattr(settings, 'STYLEGUIDE_WARM_UP', False) and \
+                self._is_server_process():
+            self.warm_up()
+
+        if getattr(settings, 'STYLEGUIDE_WATCH', False):
+            from .watcher import start_watcher
+            start_watcher()
+
+    def warm_up(self):
+        """
+        Compiles the component templates when a server starts. A broken
+        template stops it from starting.
+        """
+        from .warmup import warm_up
+
+        broken = [template_name for template_name, seconds, error
+                  in warm_up() if error is not None]
+        if broken:
+            raise ImproperlyConfigured(
+                "Broken styleguide templates: %s" % ", ".join(broken))
+
+    def _is_server_process(self):
+        """
+        Management commands, like `migrate` or `styleguide_warmup` itself,
+        serve no requests, apart from `runserver`. Any other program, like
+        a wsgi server, is taken for one which does.
+        """
+        program = os.path.basename(sys.argv[0]) if sys.argv else ''
+        if program not in ('manage.py', 'django-admin', 'django-admin.py'):
+            return True
+
+        return sys.argv[1:2] == ['runserver']
+
+    def _is_reloader_parent(self):
+        """
+        The autoreloader of `runserver` runs the server in a child process,
+        which is the one serving requests
+        """
+        return 'runserver' in sys.argv and '--noreload' not in sys.argv \
+            and os.environ.get('RUN_MAIN') != 'true'
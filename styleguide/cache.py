@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import uuid
+
+from django.core.cache import cache
+
+from .instrumentation import measure
+from .utils import Styleguide, STYLEGUIDE_CACHE_KEY
+
+
+class StyleguideCache(object):
+    """
+    Keeps the manifest of the styleguide in the django cache, along with a
+    small generation stamp which changes whenever the manifest is set.
+
+    Each process keeps the last manifest it read and the styleguide built
+    from it, so a warm request only fetches the stamp. The manifest is
+    only fetched and unpickled again once another process changed it.
+    """
+
+    def __init__(self, key=STYLEGUIDE_CACHE_KEY):
+        self.key = key
+        self.generation_key = '%s.generation' % key
+        # (generation, manifest, styleguide), replaced as a whole so
+        # threads do not need a lock to read it
+        self._local = None
+
+    def get(self, fingerprint):
+        """
+        Returns the cached styleguide if it has the given fingerprint
+        -> Styleguide or None
+        """
+        with measure('cache_get') as counts:
+            generation = cache.get(self.generation_key)
+            local = self._local
+
+            if generation is None or local is None or local[0] != generation:
+                manifest = self.get_manifest()
+                if manifest is not None:
+                    local = (manifest.get('generation'), manifest,
+                             self._build(manifest))
+                    self._local = local
+                    counts['fetch'] = 1
+                else:
+                    local = None
+            else:
+                counts['local'] = 1
+
+            if local is None or local[1]['fingerprint'] != fingerprint:
+                counts['miss'] = 1
+                return None
+
+            counts['hit'] = 1
+            return self._get_styleguide(local[2])
+
+    def get_manifest(self):
+        """ The manifest in the django cache -> dict or None """
+        return cache.get(self.key)
+
+    def set(self, manifest):
+        """
+        Stores the manifest with a new generation
+        -> Styleguide built from it, for the current request
+        """
+        generation = uuid.uuid4().hex
+        manifest = dict(manifest, generation=generation)
+
+        with measure('cache_set'):
+            cache.set_many({
+                self.key: manifest,
+                self.generation_key: generation,
+            }, None)
+
+        styleguide = self._build(manifest)
+        self._local = (generation, manifest, styleguide)
+        return self._get_styleguide(styleguide)
+
+    def clear(self):
+        """ Forgets the styleguide of this process """
+        self._local = None
+
+    def _build(self, manifest):
+        """ The styleguide of this process, built once per generation """
+        styleguide = Styleguide.from_manifest(manifest)
+        styleguide.build_indexes()
+        return styleguide
+
+    def _get_styleguide(self, styleguide):
+        """
+        Each request gets its own copy, as it sets its current module and
+        component. Everything else is shared: the modules, the components
+        and the indexes built by `_build`, and a lazy module is only
+        scanned by the first request which uses it.
+        """
+        styleguide = copy.copy(styleguide)
+        styleguide.current_module = None
+        styleguide.current_component = None
+        return styleguide
+
+
+styleguide_cache = StyleguideCache()
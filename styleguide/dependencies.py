@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import re
+
+from django.utils.encoding import force_bytes
+
+
+# `{% include %}` and `{% extends %}` with a constant template name. Names
+# given by a variable are only known when rendering, so they are not found
+TEMPLATE_REFERENCE_RE = re.compile(
+    r"""\{%\s*(?:extends|include)\s+(["'])(.+?)\1""")
+
+
+def extract_dependencies(source):
+    """
+    The names of the templates the source includes or extends, in order
+    -> list(string)
+    """
+    names = []
+    for match in TEMPLATE_REFERENCE_RE.finditer(source):
+        if match.group(2) not in names:
+            names.append(match.group(2))
+
+    return names
+
+
+class DependencyGraph(object):
+    """
+    Which templates each template of the styleguide includes or extends,
+    and the other way around, which components use each template, directly
+    or through other templates.
+    """
+
+    def __init__(self, templates=None):
+        """
+        :templates: dict(template name: dict(path, mtime, size, component,
+        dependencies)). Templates which could not be found have no entry.
+        `path` is only known from a scan, it is not kept by `to_dict`.
+        """
+        self.templates = templates if templates is not None else {}
+        self._dependents = None
+
+    def to_dict(self):
+        """
+        Leaves out the components which use no other template, as they do
+        not need a version: their own source is enough
+        """
+        return dict((name, {
+            'mtime': template['mtime'],
+            'size': template['size'],
+            'component': template['component'],
+            'dependencies': template['dependencies'],
+        }) for name, template in self.templates.items()
+            if template['dependencies'] or not template['component'])
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(templates=data)
+
+    def get_dependencies(self, template_name):
+        """
+        The templates the given one includes or extends, directly or not
+        -> list(string), sorted
+        """
+        found = set()
+        pending = [template_name]
+
+        while pending:
+            template = self.templates.get(pending.pop())
+            if template is None:
+                continue
+
+            for dependency in template['dependencies']:
+                if dependency not in found:
+                    found.add(dependency)
+                    pending.append(dependency)
+
+        found.discard(template_name)
+        return sorted(found)
+
+    def get_dependents(self, template_name):
+        """
+        The components which include or extend the given template, directly
+        or not
+        -> list(string), sorted
+        """
+        if self._dependents is None:
+            # The reverse index, built on first use
+            dependents = {}
+            for name, template in self.templates.items():
+                for dependency in template['dependencies']:
+                    dependents.setdefault(dependency, set()).add(name)
+            self._dependents = dependents
+
+        found = set()
+        pending = [template_name]
+
+        while pending:
+            for dependent in self._dependents.get(pending.pop(), ()):
+                if dependent not in found:
+                    found.add(dependent)
+                    pending.append(dependent)
+
+        found.discard(template_name)
+        return sorted(name for name in found
+                      if self.templates[name]['component'])
+
+    def get_affected_components(self, paths):
+        """
+        The components which are at one of the given paths, or which use a
+        template at one of them
+        -> list(string), sorted
+        """
+        paths = set(paths)
+        affected = set()
+
+        for name, template in self.templates.items():
+            if template.get('path') not in paths:
+                continue
+
+            if template['component']:
+                affected.add(name)
+            affected.update(self.get_dependents(name))
+
+        return sorted(affected)
+
+    def get_version(self, template_name):
+        """
+        A hash of the mtime and size of the template and of every template
+        it uses, so it changes whenever one of them is edited. Dependencies
+        which could not be found count by their name.
+        -> string or None when the template is not in the graph
+        """
+        if template_name not in self.templates:
+            return None
+
+        md5 = hashlib.md5()
+        for name in [template_name] + self.get_dependencies(template_name):
+            template = self.templates.get(name)
+            if template is None:
+                md5.update(force_bytes('%s -\n' % name))
+            else:
+                md5.update(force_bytes('%s %r %s\n' % (
+                    name, template['mtime'], template['size'])))
+
+        return md5.hexdigest()
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import hashlib
+import io
+import json
+import os
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.urlresolvers import reverse
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template, render_to_string
+from django.utils.encoding import force_bytes
+
+from .dependencies import extract_dependencies
+from .utils import Styleguide, futures
+from .views import (get_module_context, get_component_context,
+                    INDEX_TEMPLATE, MODULE_TEMPLATE, COMPONENT_TEMPLATE)
+
+
+STATE_FILE_NAME = '.styleguide_export.json'
+
+
+class StyleguideExporter(object):
+    """
+    Renders the index, module and component pages to static html files.
+
+    The files mirror the urls, so `<outdir>/<module>/index.html` is the page
+    of `reverse("styleguide.module", args=(module, ))`. A page is only
+    rendered again when the data or the templates it shows changed since
+    the last export.
+    """
+
+    def __init__(self, outdir, workers=1, force=False, styleguide=None):
+        self.outdir = outdir
+        self.workers = workers
+        self.force = force
+        self.styleguide = styleguide or Styleguide()
+        self._sources = {}
+        self._page_sources = {}
+
+    def get_pages(self):
+        """
+        -> list of (relative_path, template_name, context, fingerprint)
+        """
+        styleguide = self.styleguide
+        index_data = []
+        pages = []
+
+        for module in styleguide.modules:
+            module_data = self._get_module_data(module)
+            index_data.append(module_data)
+            module_header = {'id': module.id, 'name': module.name,
+                             'link': module.link}
+
+            context = get_module_context(copy.copy(styleguide), module.name)
+            components = [
+                (component.to_dict(),
+                 self._get_component_source(component.template))
+                for component in module.components]
+            pages.append((self._get_path(module.link), MODULE_TEMPLATE,
+                          context, self._get_fingerprint(
+                              MODULE_TEMPLATE, module_data, components)))
+
+            for component in module.components:
+                context = get_component_context(copy.copy(styleguide),
+                                                module.name, component.id)
+                pages.append((self._get_path(component.page),
+                              COMPONENT_TEMPLATE,
+                              context, self._get_fingerprint(
+                                  COMPONENT_TEMPLATE, module_header,
+                                  component.to_dict(),
+                                  self._get_component_source(
+                                      component.template))))
+
+        pages.insert(0, (self._get_path(reverse("styleguide.index")),
+                         INDEX_TEMPLATE, {'styleguide': styleguide},
+                         self._get_fingerprint(INDEX_TEMPLATE, index_data)))
+        return pages
+
+    def export(self):
+        """
+        Writes the pages which changed and removes the ones which are gone
+        -> list of (relative_path, seconds) of the rendered pages, and the
+        number of unchanged pages
+        """
+        state = self._load_state()
+        pages = self.get_pages()
+        new_state = {}
+        to_render = []
+
+        for relative_path, template_name, context, fingerprint in pages:
+            new_state[relative_path] = fingerprint
+            full_path = os.path.join(self.outdir, relative_path)
+
+            if self.force or state.get(relative_path) != fingerprint or \
+                    not os.path.isfile(full_path):
+                to_render.append((relative_path, template_name, context))
+
+        if self.workers > 1 and len(to_render) > 1:
+            if futures is None:
+                raise ImproperlyConfigured(
+                    "Exporting with workers needs the `futures` package "
+                    "on python 2")
+
+            with futures.ThreadPoolExecutor(self.workers) as executor:
+                timings = list(executor.map(self._render_page, to_render))
+        else:
+            timings = [self._render_page(page) for page in to_render]
+
+        for relative_path in set(state) - set(new_state):
+            full_path = os.path.join(self.outdir, relative_path)
+            if os.path.isfile(full_path):
+                os.remove(full_path)
+
+        self._save_state(new_state)
+        return timings, len(pages) - len(to_render)
+
+    def _render_page(self, page):
+        relative_path, template_name, context = page
+        start = time.time()
+
+        html = render_to_string(template_name, context)
+        full_path = os.path.join(self.outdir, relative_path)
+        folder = os.path.dirname(full_path)
+        if not os.path.isdir(folder):
+            try:
+                os.makedirs(folder)
+            except OSError:
+                # created by another worker meanwhile
+                if not os.path.isdir(folder):
+                    raise
+
+        with io.open(full_path, 'w', encoding='utf-8') as page_file:
+            page_file.write(html)
+
+        return relative_path, time.time() - start
+
+    def _get_path(self, url):
+        """ The file of the page with the given url, relative to outdir """
+        prefix = reverse("styleguide.index")
+        relative_url = url[len(prefix):] if url.startswith(prefix) else url
+        parts = [part for part in relative_url.split('/') if part]
+        return os.path.join(*(parts + ['index.html']))
+
+    def _get_module_data(self, module):
+        return {
+            'id': module.id,
+            'name': module.name,
+            'link': module.link,
+            'doc': module.doc,
+            'components': [c.to_dict() for c in module.components],
+        }
+
+    def _get_source(self, template_name):
+        if template_name not in self._sources:
+            template = get_template(template_name)
+            self._sources[template_name] = template.template.source
+
+        return self._sources[template_name]
+
+    def _get_component_source(self, template_name):
+        """
+        The source of the component, with the version of the templates it
+        includes or extends, so its pages are rendered again when one of
+        them changes
+        """
+        graph = self.styleguide.get_dependency_graph()
+        return [self._get_source(template_name),
+                graph.get_version(template_name)]
+
+    def _get_page_sources(self, template_name):
+        """
+        The sources of the page's template and of every template it extends
+        or includes, like `base.html`, so overriding or editing one of them
+        renders the page again
+        -> list([name, source])
+        """
+        if template_name not in self._page_sources:
+            sources = []
+            found = set()
+            pending = [template_name]
+
+            while pending:
+                name = pending.pop(0)
+                if name in found:
+                    continue
+                found.add(name)
+
+                try:
+                    source = self._get_source(name)
+                except TemplateDoesNotExist:
+                    continue
+
+                sources.append([name, source])
+                pending += extract_dependencies(source)
+
+            self._page_sources[template_name] = sources
+
+        return self._page_sources[template_name]
+
+    def _get_fingerprint(self, template_name, *data):
+        content = json.dumps([self._get_page_sources(template_name), data],
+                             sort_keys=True)
+        return hashlib.md5(force_bytes(content)).hexdigest()
+
+    def _load_state(self):
+        try:
+            with open(os.path.join(self.outdir, STATE_FILE_NAME)) as state:
+                return json.load(state)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _save_state(self, state):
+        if not os.path.isdir(self.outdir):
+            os.makedirs(self.outdir)
+
+        with open(os.path.join(self.outdir, STATE_FILE_NAME), 'w') as f:
+            json.dump(state, f)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import threading
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.encoding import force_bytes
+
+
+# Off by default: a fragment is rendered with the context of the page,
+# including the request and the user, but it is shared by every user. Only
+# turn it on when no component uses them, like `{% csrf_token %}` does
+STYLEGUIDE_FRAGMENT_CACHE = getattr(settings, 'STYLEGUIDE_FRAGMENT_CACHE',
+                                    False)
+STYLEGUIDE_FRAGMENT_CACHE_SIZE = getattr(
+    settings, 'STYLEGUIDE_FRAGMENT_CACHE_SIZE', 256)
+STYLEGUIDE_FRAGMENT_CACHE_TIMEOUT = getattr(
+    settings, 'STYLEGUIDE_FRAGMENT_CACHE_TIMEOUT', None)
+
+
+class FragmentCache(object):
+    """
+    Keeps the rendered html of the components, keyed by the template name
+    and its version, so an edited template gets a new key. The version
+    comes from the dependency graph of the styleguide, which also changes
+    when a template the component uses is edited. Without one, the hash of
+    the component's source is used.
+
+    The last `max_size` fragments are kept in memory, in front of the
+    django cache which is shared by all processes.
+    """
+
+    key_prefix = 'styleguide_fragment'
+
+    def __init__(self, max_size=STYLEGUIDE_FRAGMENT_CACHE_SIZE,
+                 timeout=STYLEGUIDE_FRAGMENT_CACHE_TIMEOUT):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_key(self, template_name, version):
+        name = hashlib.md5(force_bytes(template_name)).hexdigest()
+        return '%s:%s:%s' % (self.key_prefix, name, version)
+
+    def get(self, key):
+        with self._lock:
+            html = self._local.pop(key, None)
+            if html is not None:
+                # most recently used
+                self._local[key] = html
+                return html
+
+        html = cache.get(key)
+        if html is not None:
+            self._set_local(key, html)
+
+        return html
+
+    def set(self, key, html):
+        self._set_local(key, html)
+        cache.set(key, html, self.timeout)
+
+    def _set_local(self, key, html):
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._local.pop(key, None)
+            self._local[key] = html
+
+            while len(self._local) > self.max_size:
+                # least recently used
+                self._local.popitem(last=False)
+
+    def clear(self):
+        """ Empties the memory tier. Keys in the django cache stay """
+        with self._lock:
+            self._local.clear()
+
+    def render(self, template_name, context, version=None):
+        """
+        Renders the template with the given context, like `{% include %}`,
+        unless its html is already cached. With a `version`, a cached
+        fragment is used without loading the template at all.
+        -> string
+        """
+        engine = context.template.engine
+        if not STYLEGUIDE_FRAGMENT_CACHE:
+            return engine.get_template(template_name).render(context)
+
+        template = None
+        if version is None:
+            template = engine.get_template(template_name)
+            version = hashlib.md5(force_bytes(template.source)).hexdigest()
+
+        key = self.get_key(template_name, version)
+        html = self.get(key)
+
+        if html is None:
+            if template is None:
+                template = engine.get_template(template_name)
+            html = template.render(context)
+            self.set(key, html)
+
+        return html
+
+
+fragment_cache = FragmentCache()
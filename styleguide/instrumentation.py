@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+from contextlib import contextmanager
+from timeit import default_timer
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from .signals import phase_finished
+
+
+logger = logging.getLogger('styleguide')
+# Silences python 2's "No handlers could be found" for projects which do
+# not configure it
+logger.addHandler(logging.NullHandler())
+
+_local = threading.local()
+
+
+class Timings(object):
+    """
+    The phases of a single request, in the order they finished. Phases
+    which happen more than once have their durations and counts summed.
+    """
+
+    def __init__(self):
+        self.phases = OrderedDict()
+
+    def add(self, phase, duration, counts):
+        data = self.phases.setdefault(phase, {'duration': 0.0, 'counts': {}})
+        data['duration'] += duration
+
+        for name, value in counts.items():
+            data['counts'][name] = data['counts'].get(name, 0) + value
+
+    def to_header(self):
+        """
+        The phases formatted for the `Server-Timing` response header
+        -> string
+        """
+        metrics = []
+        for phase, data in self.phases.items():
+            metric = '%s;dur=%.2f' % (phase, data['duration'])
+            if data['counts']:
+                metric += ';desc="%s"' % ' '.join(
+                    '%s=%s' % (name, data['counts'][name])
+                    for name in sorted(data['counts']))
+            metrics.append(metric)
+
+        return ', '.join(metrics)
+
+
+def get_timings():
+    """ The timings collected for the current request -> Timings or None """
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def collect_timings():
+    """
+    Collects the phases measured in this thread until the block is over.
+    Nested blocks share the timings of the outer one.
+    """
+    timings = get_timings()
+    if timings is not None:
+        yield timings
+        return
+
+    _local.timings = timings = Timings()
+    try:
+        yield timings
+    finally:
+        _local.timings = None
+
+
+@contextmanager
+def measure(phase, sender=None):
+    """
+    Measures the duration of the block. The block fills the yielded dict
+    with the counts of what it went through.
+
+    The phase is sent with the `phase_finished` signal, logged at the debug
+    level on the `styleguide` logger and added to the timings of the
+    current request.
+    """
+    counts = {}
+    start = default_timer()
+    try:
+        yield counts
+    finally:
+        duration = (default_timer() - start) * 1000
+        record(phase, duration, counts, sender)
+
+
+def record(phase, duration, counts, sender=None):
+    """ Reports a phase measured in milliseconds """
+    timings = get_timings()
+    if timings is not None:
+        timings.add(phase, duration, counts)
+
+    phase_finished.send(sender=sender, phase=phase, duration=duration,
+                        counts=counts)
+    logger.debug('styleguide %s: %.2f ms %r', phase, duration, counts,
+                 extra={'phase': phase, 'duration': duration,
+                        'counts': counts})
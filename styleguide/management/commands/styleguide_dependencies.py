@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand, CommandError
+
+from styleguide.utils import Styleguide
+
+
+class Command(BaseCommand):
+    help = ("Lists the templates each component includes or extends. With "
+            "--template, lists the components which use that template.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--template', default=None,
+                            help="A template name, like "
+                                 "styleguide/includes/icon.html")
+
+    def handle(self, *args, **options):
+        graph = Styleguide(lazy=False).get_dependency_graph()
+
+        template_name = options['template']
+        if template_name is not None:
+            if template_name not in graph.templates:
+                raise CommandError("%s is not used by any component" %
+                                   template_name)
+
+            for dependent in graph.get_dependents(template_name):
+                self.stdout.write(dependent)
+            return
+
+        for name, template in sorted(graph.templates.items()):
+            if not template['component']:
+                continue
+
+            self.stdout.write(name)
+            for dependency in graph.get_dependencies(name):
+                found = '' if dependency in graph.templates else \
+                    ' (not found)'
+                self.stdout.write("    %s%s" % (dependency, found))
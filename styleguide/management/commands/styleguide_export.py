@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand
+
+from styleguide.export import StyleguideExporter
+
+
+class Command(BaseCommand):
+    help = ("Renders the styleguide to static html files. Only pages whose "
+            "components changed since the last export are rendered again.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('outdir', help="Where to write the html files.")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="How many pages are rendered at once.")
+        parser.add_argument('--force', action='store_true', default=False,
+                            help="Renders every page again.")
+
+    def handle(self, *args, **options):
+        exporter = StyleguideExporter(options['outdir'],
+                                      workers=options['workers'],
+                                      force=options['force'])
+
+        timings, unchanged = exporter.export()
+
+        total = 0
+        for relative_path, seconds in timings:
+            total += seconds
+            if options['verbosity'] >= 1:
+                self.stdout.write("%8.1f ms  %s" % (seconds * 1000,
+                                                    relative_path))
+
+        self.stdout.write("%s pages rendered in %.1f ms, %s unchanged" % (
+            len(timings), total * 1000, unchanged))
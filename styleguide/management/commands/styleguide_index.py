@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from styleguide.utils import StyleguideLoader, STYLEGUIDE_MANIFEST_PATH
+
+
+class Command(BaseCommand):
+    help = ("Builds the styleguide component manifest. Only templates "
+            "changed since the last build are parsed again.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=STYLEGUIDE_MANIFEST_PATH,
+                            help="Where to write the manifest. Defaults to "
+                                 "the STYLEGUIDE_MANIFEST_PATH setting.")
+        parser.add_argument('--force', action='store_true', default=False,
+                            help="Parses every template again.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path:
+            raise CommandError("Set STYLEGUIDE_MANIFEST_PATH or give --path")
+
+        if options['force'] and os.path.exists(path):
+            os.remove(path)
+
+        loader = StyleguideLoader(manifest_path=path)
+        modules = loader.get_styleguide_components()
+        loader.save_manifest()
+
+        components = sum(len(m['components']) for m in modules.values())
+        self.stdout.write("%s components in %s modules, %s files parsed. "
+                          "Manifest written to %s" % (
+                              components, len(modules),
+                              loader.parsed_files, path))
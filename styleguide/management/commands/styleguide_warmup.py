@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+from django.core.management.base import BaseCommand, CommandError
+
+from styleguide.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = ("Compiles the template of every component, reporting the time "
+            "each one took. Fails if any of them is broken.")
+
+    def handle(self, *args, **options):
+        results = warm_up()
+
+        total = 0
+        errors = []
+        for template_name, seconds, error in results:
+            total += seconds
+            if error is not None:
+                errors.append(template_name)
+                self.stderr.write("%s: %s" % (template_name, error))
+            elif options['verbosity'] >= 1:
+                self.stdout.write("%8.1f ms  %s" % (seconds * 1000,
+                                                    template_name))
+
+        self.stdout.write("%s templates compiled in %.1f ms, %s broken" % (
+            len(results), total * 1000, len(errors)))
+
+        if errors:
+            raise CommandError("Broken templates: %s" % ", ".join(errors))
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from .dependencies import DependencyGraph
+
+
+MANIFEST_VERSION = 5
+
+
+class ComponentManifest(object):
+    """
+    Snapshot of a styleguide scan which can be stored on disk.
+
+    Besides the components found, it keeps the mtime of every scanned
+    directory and the mtime, size, parsed doc and dependencies of every
+    scanned file, so a later scan only needs to parse the files whose stat
+    changed. The templates the components include or extend are kept as
+    files too, with no doc.
+    """
+
+    def __init__(self, roots=(), url_prefix=None, dirs=None, files=None,
+                 modules=None, templates=None, options=None):
+        """
+        :templates: dict(template name: dict(path, component)) of the
+        components and of the templates they use
+        :options: dict of the settings the scan depends on, like the ignored
+        folders, as plain lists and strings
+        """
+        self.roots = list(roots)
+        self.url_prefix = url_prefix
+        self.options = options if options is not None else {}
+        self.dirs = dirs if dirs is not None else {}
+        self.files = files if files is not None else {}
+        self.modules = modules if modules is not None else OrderedDict()
+        self.templates = templates if templates is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """
+        Returns the manifest stored in the given path or None if it does not
+        exist or was written by another version
+        """
+        try:
+            with open(path) as manifest_file:
+                data = json.load(manifest_file)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or \
+                data.get('version') != MANIFEST_VERSION:
+            return None
+
+        modules = OrderedDict()
+        for module in data['modules']:
+            modules[module['id']] = module
+
+        return cls(roots=data['roots'], url_prefix=data['url_prefix'],
+                   dirs=data['dirs'], files=data['files'], modules=modules,
+                   templates=data['templates'], options=data['options'])
+
+    def save(self, path):
+        data = {
+            'version': MANIFEST_VERSION,
+            'roots': self.roots,
+            'url_prefix': self.url_prefix,
+            'options': self.options,
+            'dirs': self.dirs,
+            'files': self.files,
+            'modules': list(self.modules.values()),
+            'templates': self.templates,
+        }
+
+        # Writes to a temporary file first, so readers never see half of it
+        tmp_path = '%s.tmp' % path
+        with open(tmp_path, 'w') as manifest_file:
+            json.dump(data, manifest_file)
+
+        try:
+            os.replace(tmp_path, path)
+        except AttributeError:
+            # python 2
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(tmp_path, path)
+
+    def add_dir(self, path, stat):
+        self.dirs[path] = stat.st_mtime
+
+    def add_file(self, path, stat, doc, dependencies=None):
+        self.files[path] = {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'doc': doc,
+            'dependencies': dependencies,
+        }
+
+    def add_template(self, name, path, stat, dependencies, component=False):
+        """
+        Records the templates a component or one of the templates it uses
+        includes or extends, keeping the doc of the file if it did not change
+        """
+        entry = self._get_entry(path, stat)
+        if entry is None:
+            self.add_file(path, stat, None, dependencies)
+        else:
+            entry['dependencies'] = dependencies
+
+        self.templates[name] = {'path': path, 'component': component}
+
+    def get_dependency_graph(self):
+        """ -> DependencyGraph of the recorded templates """
+        templates = {}
+        for name, template in self.templates.items():
+            entry = self.files.get(template['path'])
+            if entry is None or entry['dependencies'] is None:
+                continue
+
+            templates[name] = {
+                'path': template['path'],
+                'mtime': entry['mtime'],
+                'size': entry['size'],
+                'component': template['component'],
+                'dependencies': entry['dependencies'],
+            }
+
+        return DependencyGraph(templates)
+
+    def get_last_modified(self):
+        """ The latest mtime of the scanned dirs and files -> float """
+        mtimes = list(self.dirs.values())
+        mtimes += [entry['mtime'] for entry in self.files.values()]
+        return max(mtimes) if mtimes else None
+
+    def get_doc(self, path, stat):
+        """
+        Returns the doc stored for the given file if its stat did not change
+        since it was parsed, otherwise None
+        """
+        entry = self._get_entry(path, stat)
+        return entry['doc'] if entry is not None else None
+
+    def get_dependencies(self, path, stat):
+        """
+        Returns the dependencies stored for the given file if its stat did
+        not change since it was read, otherwise None
+        """
+        entry = self._get_entry(path, stat)
+        return entry['dependencies'] if entry is not None else None
+
+    def _get_entry(self, path, stat):
+        """ The file's entry, unless its stat changed -> dict or None """
+        entry = self.files.get(path)
+        if entry is None:
+            return None
+
+        if entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+            return None
+
+        return entry
+
+    def is_fresh(self, roots, url_prefix, options=None):
+        """
+        Returns True when nothing changed in the scanned tree, that is: the
+        same styleguide dirs, the same urls, the same scan settings, no file
+        added or removed from any directory and no file modified.
+        """
+        if list(roots) != self.roots or url_prefix != self.url_prefix or \
+                (options or {}) != self.options:
+            return False
+
+        try:
+            for path, mtime in self.dirs.items():
+                if os.stat(path).st_mtime != mtime:
+                    return False
+
+            for path, entry in self.files.items():
+                stat = os.stat(path)
+                if entry['mtime'] != stat.st_mtime or \
+                        entry['size'] != stat.st_size:
+                    return False
+        except OSError:
+            return False
+
+        return True
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import re
+from fnmatch import translate
+
+
+class PathFilter(object):
+    """
+    Decides which folders and files of a styleguide dir are scanned, from
+    glob patterns matched against their path relative to it, with `/` as
+    separator. `*` matches within a single folder or file name and `**`
+    matches any number of folders. A pattern without `/`, like
+    `node_modules`, matches the name anywhere in the tree; starting it with
+    `/` matches it right under the styleguide dir only.
+
+    A folder matching an `exclude` pattern is not entered at all. With
+    `include` patterns, only the components they match are scanned, and
+    a folder is only entered if one of them could match below it. A pattern
+    matching a folder matches everything in it.
+    """
+
+    def __init__(self, include=(), exclude=(), extensions=('.html', )):
+        """
+        :include: Glob patterns of the components to scan, all by default
+        :exclude: Glob patterns of the folders and files to skip
+        :extensions: The extensions of the templates, other files are skipped
+        """
+        self.patterns = {'include': list(include), 'exclude': list(exclude)}
+        self.include = [self._compile(pattern) for pattern in include]
+        self.exclude = [self._compile(pattern) for pattern in exclude]
+        self.extensions = tuple(extensions)
+
+    def to_dict(self):
+        """ The patterns and extensions, as plain lists -> dict """
+        return dict(self.patterns, extensions=list(self.extensions))
+
+    def _compile(self, pattern):
+        """ -> list of the compiled parts of the pattern, or '**' """
+        anchored = '/' in pattern.rstrip('/')
+        pattern = pattern.strip('/')
+        if not anchored:
+            pattern = '**/' + pattern
+
+        return [part if part == '**' else re.compile(translate(part))
+                for part in pattern.split('/')]
+
+    def is_excluded(self, relative_path):
+        """ -> bool True when the path matches an `exclude` pattern """
+        return self._matches_any(self.exclude, relative_path.split('/'))
+
+    def is_template(self, file_name):
+        """ -> bool True when the file has one of the extensions """
+        return file_name.endswith(self.extensions)
+
+    def allows_folder(self, relative_path):
+        """ -> bool False when the folder is not to be entered """
+        if self.is_excluded(relative_path):
+            return False
+
+        parts = relative_path.split('/')
+        return not self.include or any(self._could_match(pattern, parts)
+                                       for pattern in self.include)
+
+    def allows_file(self, relative_path):
+        """
+        The files right under the styleguide dir are not components, so
+        only the extensions and `exclude` apply to them
+        -> bool
+        """
+        if not self.is_template(relative_path) or \
+                self.is_excluded(relative_path):
+            return False
+
+        parts = relative_path.split('/')
+        if len(parts) == 1 or not self.include:
+            return True
+
+        # The file or one of its folders
+        return any(self._matches_any(self.include, parts[:length])
+                   for length in range(1, len(parts) + 1))
+
+    def strip_extension(self, file_name):
+        """ -> the file name without its template extension """
+        for extension in self.extensions:
+            if file_name.endswith(extension):
+                return file_name[:-len(extension)]
+
+        return file_name
+
+    def _matches_any(self, patterns, parts):
+        return any(self._match(pattern, parts) for pattern in patterns)
+
+    def _match(self, pattern, parts):
+        """ -> bool True when the whole path matches the pattern """
+        if not pattern:
+            return not parts
+
+        if pattern[0] == '**':
+            return any(self._match(pattern[1:], parts[index:])
+                       for index in range(len(parts) + 1))
+
+        return bool(parts) and pattern[0].match(parts[0]) is not None and \
+            self._match(pattern[1:], parts[1:])
+
+    def _could_match(self, pattern, parts):
+        """
+        -> bool True when the pattern matches the folder, one of its parent
+        folders or something below it
+        """
+        if not parts or not pattern or pattern[0] == '**':
+            return True
+
+        return pattern[0].match(parts[0]) is not None and \
+            self._could_match(pattern[1:], parts[1:])
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+import re
+from bisect import bisect_left
+
+from django.utils.encoding import force_text
+
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# How much a token counts, depending on where it was found
+NAME_WEIGHT = 8
+ID_WEIGHT = 4
+MODULE_WEIGHT = 2
+DOC_WEIGHT = 1
+
+# A query token which is only the start of a token counts this much less
+PREFIX_FACTOR = 0.5
+
+
+def tokenize(text):
+    """ -> list of the lowercased words of the text """
+    return TOKEN_RE.findall(force_text(text).lower())
+
+
+class SearchIndex(object):
+    """
+    Inverted index of the components: each token of their names, ids,
+    module names and doc tags points to the components which have it,
+    with a weight. The tokens are kept sorted, so a query token is looked
+    up as a prefix with a binary search instead of going through every
+    component.
+    """
+
+    def __init__(self, components=None, postings=None, tokens=None):
+        """
+        :components: list of [module_id, component_id]
+        :postings: dict(token: dict(component index: weight))
+        :tokens: The tokens of `postings`, sorted
+        """
+        self.components = components if components is not None else []
+        self.postings = postings if postings is not None else {}
+        self.tokens = tokens if tokens is not None else sorted(self.postings)
+
+    @classmethod
+    def build(cls, modules):
+        """
+        :modules: list of module dicts, as in `Styleguide.to_manifest`.
+        Modules which were not scanned are skipped.
+        -> SearchIndex
+        """
+        index = cls()
+
+        for module in modules:
+            for component in module.get('components', ()):
+                fields = [
+                    (component['name'], NAME_WEIGHT),
+                    (component['id'], ID_WEIGHT),
+                    (module['name'], MODULE_WEIGHT),
+                ]
+                for tag, text in (component['doc'] or {}).items():
+                    fields.append((tag, DOC_WEIGHT))
+                    fields.append((text, DOC_WEIGHT))
+
+                index.add(module['id'], component['id'], fields)
+
+        index.tokens = sorted(index.postings)
+        return index
+
+    def add(self, module_id, component_id, fields):
+        """
+        :fields: list of (text, weight). A token found in several fields
+        keeps the highest weight.
+        """
+        position = len(self.components)
+        self.components.append([module_id, component_id])
+
+        for text, weight in fields:
+            for token in tokenize(text):
+                postings = self.postings.setdefault(token, {})
+                postings[position] = max(postings.get(position, 0), weight)
+
+    def to_dict(self):
+        """
+        Only keeps the postings: `from_dict` sorts the tokens again and
+        lists the components from the modules, which are cached anyway
+        """
+        return {'postings': self.postings}
+
+    @classmethod
+    def from_dict(cls, data, modules):
+        """
+        :modules: The modules the index was built from, as in `build`
+        -> SearchIndex
+        """
+        components = [[module['id'], component['id']]
+                      for module in modules
+                      for component in module.get('components', ())]
+        return cls(components=components, postings=data['postings'])
+
+    def search(self, query, limit=None):
+        """
+        Returns the components which have every word of the query, either
+        whole or as the start of a token, the best matches first
+        -> list of (module_id, component_id)
+        """
+        scores = None
+
+        for word in set(tokenize(query)):
+            word_scores = {}
+            index = bisect_left(self.tokens, word)
+
+            while index < len(self.tokens) and \
+                    self.tokens[index].startswith(word):
+                token = self.tokens[index]
+                index += 1
+
+                factor = 1 if token == word else PREFIX_FACTOR
+                for position, weight in self.postings[token].items():
+                    word_scores[position] = max(word_scores.get(position, 0),
+                                                weight * factor)
+
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = dict((position, score + word_scores[position])
+                              for position, score in scores.items()
+                              if position in word_scores)
+
+            if not scores:
+                return []
+
+        if scores is None:
+            return []
+
+        # In the styleguide's order when the scores are equal
+        ranked = sorted(scores, key=lambda position: (-scores[position],
+                                                      position))
+        return [tuple(self.components[position])
+                for position in ranked[:limit]]
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+
+from django.dispatch import Signal
+
+
+# Sent when a phase of building or rendering the styleguide is over.
+# `duration` is in milliseconds and `counts` a dict of what the phase went
+# through, like {'dirs': 4, 'files': 20}
+phase_finished = Signal(providing_args=['phase', 'duration', 'counts'])
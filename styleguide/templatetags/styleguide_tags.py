@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+from django import template
+from django.utils.safestring import mark_safe
+
+from styleguide.fragments import fragment_cache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def styleguide_component(context, component):
+    """
+    Renders the component's template, like `{% include component.template %}`,
+    reusing its html while neither the template nor the templates it
+    includes or extends change.
+
+    {% styleguide_component component %}
+    """
+    version = None
+    styleguide = context.get('styleguide')
+    if styleguide is not None:
+        version = styleguide.get_dependency_graph().get_version(
+            component.template)
+
+    with context.push():
+        return mark_safe(fragment_cache.render(component.template, context,
+                                               version))
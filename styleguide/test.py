@@ -1,11 +1,42 @@
 # -*- coding: utf-8 -*-
 
+import copy
+import json
+import logging
 import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
 
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command, CommandError
 from django.core.urlresolvers import reverse
-from django.test import TestCase
+from django.template import Context, Engine, TemplateSyntaxError
+from django.test import RequestFactory, TestCase
+from django.utils.six import StringIO
 
-from .utils import StyleguideLoader, Styleguide, STYLEGUIDE_DIR_NAME
+from . import fragments, utils, views
+from .cache import StyleguideCache, styleguide_cache
+from .dependencies import extract_dependencies
+from .export import StyleguideExporter
+from .fragments import FragmentCache, fragment_cache
+from .instrumentation import Timings
+from .paths import PathFilter
+from .search import SearchIndex
+from .signals import phase_finished
+from .warmup import warm_up
+from .watcher import StyleguideWatcher, watcher
+from .utils import (StyleguideLoader, Styleguide, StyleguideComponent,
+                    LinkBuilder,
+                    STYLEGUIDE_DIR_NAME, STYLEGUIDE_CACHE_KEY,
+                    STYLEGUIDE_CACHE_LOCK_KEY, futures)
 from .factories import UserFactory, USER_PASSWORD
 
 
@@ -16,6 +47,46 @@ OTHER_TEMPLATE_PATH = os.path.join(PROJECT_ROOT, 'styleguide_mock',
                                    'other_templates')
 STYLEGUIDE_URL = reverse("styleguide.index")
 
+
+class TemporaryStyleguideMixin(object):
+    """
+    Copies the styleguide folders of `styleguide_mock` to a temporary
+    directory, so tests can change them
+    """
+
+    def setUp(self):
+        super(TemporaryStyleguideMixin, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+        self.template_dirs = []
+        for name, path in (('templates', MOCK_PROJECT_PATH),
+                           ('other_templates', OTHER_TEMPLATE_PATH)):
+            template_dir = os.path.join(self.tmp_dir, name,
+                                        STYLEGUIDE_DIR_NAME)
+            shutil.copytree(os.path.join(path, STYLEGUIDE_DIR_NAME),
+                            template_dir)
+            self.template_dirs.append(template_dir)
+
+    def get_loader(self, **kwargs):
+        loader = StyleguideLoader(**kwargs)
+        loader._get_template_dirs = lambda: tuple(self.template_dirs)
+        return loader
+
+    def write_template(self, path, contents):
+        """ Writes the file, making sure its mtime changes """
+        path = os.path.join(self.tmp_dir, path)
+        mtime = None
+        if os.path.exists(path):
+            mtime = os.stat(path).st_mtime + 10
+
+        with open(path, 'w') as template:
+            template.write(contents)
+
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+
 DOC_STRING = """@doc
 
 @name layout area
@@ -68,10 +139,12 @@ class StyleguideLoaderTest(TestCase):
         expected_result = [
             {'id': u'footer', 'file_name': u'footer.html', 'name': u'footer',
              'template': u'styleguide/layout/footer.html', 'doc': {},
-             'link': STYLEGUIDE_URL+'layout#footer'},
+             'link': STYLEGUIDE_URL+'layout#footer',
+             'page': STYLEGUIDE_URL+'layout/footer/'},
             {'id': u'header', 'file_name': u'header.html', 'name': u'header',
              'template': u'styleguide/layout/header.html', 'doc': {},
-             'link': STYLEGUIDE_URL+'layout#header'}
+             'link': STYLEGUIDE_URL+'layout#header',
+             'page': STYLEGUIDE_URL+'layout/header/'}
         ]
 
         path_to_test = os.path.join(OTHER_TEMPLATE_PATH, STYLEGUIDE_DIR_NAME)
@@ -80,15 +153,37 @@ class StyleguideLoaderTest(TestCase):
 
         self.assertEqual(result, expected_result)
 
-    def test_extract_doc_from_file(self):
+    def test_extract_doc(self):
         expected_result = DOC_STRING
 
         path_to_file = os.path.join(MOCK_PROJECT_PATH, STYLEGUIDE_DIR_NAME,
                                     'components', '02-area.html')
-        result = self.loader.extract_doc_from_file(path_to_file)
+        result = self.loader.extract_doc(self.loader._read_file(path_to_file))
 
         self.assertEqual(result, expected_result)
 
+    def test_extract_doc_edge_cases(self):
+        # [ (source, expected_result), ... ]
+        sources_to_be_tested = [
+            ("<div>no doc here</div>", ""),
+            ("{% comment %}\n@name a{% endcomment %}", "@name a"),
+            ("{% load static %}{% comment 'doc' %}@name b{% endcomment %}",
+             "@name b"),
+            ("{%comment%} @name c {%endcomment%}"
+             "{% comment %}x{% endcomment %}", "@name c"),
+            ("x" * 5000 + "{% comment %}@name d{% endcomment %}", "@name d"),
+            ("{% comment %} never closed", ""),
+            ("{% if a %}{% comment %}x{% endcomment %}{% endif %}"
+             "{% comment %}@name e{% endcomment %}", "@name e"),
+            ("{% block a %}{% if b %}{% comment %}x{% endcomment %}{% endif %}"
+             "{% endblock %}{% comment %}@name f{% endcomment %}", "@name f"),
+            ("{% if a %}{% comment %}x{% endcomment %}{% endif %}", ""),
+            ("{% comments %}{% comment %}@name g{% endcomment %}", "@name g"),
+        ]
+
+        for source, expected_result in sources_to_be_tested:
+            self.assertEqual(self.loader.extract_doc(source), expected_result)
+
     def test_parse_doc(self):
         expected_result = {
             'name': 'layout area',
@@ -120,6 +215,528 @@ class StyleguideLoaderTest(TestCase):
         self.assertEqual(expected_result, result)
 
 
+class LinkBuilderTest(TestCase):
+
+    def test_same_links_as_reverse(self):
+        links = LinkBuilder()
+
+        # [ (module_id, component_id), ... ]
+        ids_to_be_tested = [
+            ('layout', 'footer'),
+            ('components', 'bar_2'),
+            (u'm\xf3dulo', u'cora\xe7\xe3o'),
+        ]
+
+        for module_id, component_id in ids_to_be_tested:
+            self.assertEqual(links.get_module_link(module_id),
+                             reverse('styleguide.module', args=(module_id, )))
+
+            url = reverse('styleguide.component',
+                          args=(module_id, component_id))
+            self.assertEqual(links.get_component_link(module_id, component_id),
+                             url.replace('%23', '#'))
+
+            url = reverse('styleguide.component_page',
+                          args=(module_id, component_id))
+            self.assertEqual(
+                links.get_component_page_link(module_id, component_id), url)
+
+
+class ComponentManifestTest(TemporaryStyleguideMixin, TestCase):
+
+    def setUp(self):
+        super(ComponentManifestTest, self).setUp()
+        self.manifest_path = os.path.join(self.tmp_dir, 'manifest.json')
+
+    def build_manifest(self):
+        loader = self.get_loader(manifest_path=self.manifest_path)
+        result = loader.get_styleguide_components()
+        loader.save_manifest()
+        return result, loader
+
+    def test_read_from_manifest(self):
+        expected_result, loader = self.build_manifest()
+        self.assertEqual(loader.parsed_files, 5)
+
+        loader = self.get_loader(manifest_path=self.manifest_path)
+        result = loader.get_styleguide_components()
+
+        self.assertEqual(loader.parsed_files, 0)
+        self.assertEqual(list(result.keys()), list(expected_result.keys()))
+        self.assertEqual(result, expected_result)
+
+    def test_only_changed_files_are_parsed(self):
+        self.build_manifest()
+        self.write_template(
+            'templates/styleguide/components/02-area.html',
+            '{% comment %}@name changed area{% endcomment %}')
+
+        loader = self.get_loader(manifest_path=self.manifest_path)
+        result = loader.get_styleguide_components()
+
+        self.assertEqual(loader.parsed_files, 1)
+        names = [c['name'] for c in result['components']['components']]
+        self.assertEqual(names, ['bar', 'changed area'])
+
+    def test_new_files_are_found(self):
+        self.build_manifest()
+        self.write_template('other_templates/styleguide/layout/menu.html',
+                            '<nav></nav>')
+
+        loader = self.get_loader(manifest_path=self.manifest_path)
+        result = loader.get_styleguide_components()
+
+        self.assertEqual(loader.parsed_files, 1)
+        names = [c['name'] for c in result['layout']['components']]
+        self.assertEqual(names, ['footer', 'header', 'menu'])
+
+    def set_utils_setting(self, name, value):
+        self.addCleanup(setattr, utils, name, getattr(utils, name))
+        setattr(utils, name, value)
+
+    def test_scan_settings_are_checked(self):
+        self.build_manifest()
+        self.set_utils_setting('STYLEGUIDE_IGNORE_FOLDERS',
+                               ('includes', 'layout'))
+
+        loader = self.get_loader(manifest_path=self.manifest_path)
+        result = loader.get_styleguide_components()
+        self.assertEqual(list(result.keys()), ['components'])
+
+        self.set_utils_setting('STYLEGUIDE_DOCFILE_NAME', 'README.html')
+        self.set_utils_setting('STYLEGUIDE_IGNORE_FOLDERS', ('includes', ))
+
+        loader = self.get_loader(manifest_path=self.manifest_path)
+        result = loader.get_styleguide_components()
+        self.assertEqual(result['layout']['doc'], {})
+        self.assertIn('__doc__.html', [c['file_name'] for c
+                                       in result['layout']['components']])
+
+    def test_path_filter_is_checked(self):
+        self.build_manifest()
+        area = os.path.join('styleguide', 'components', '02-area.html')
+
+        loader = self.get_loader(manifest_path=self.manifest_path,
+                                 path_filter=PathFilter(exclude=['0*.html']))
+        result = loader.get_styleguide_components()
+        self.assertNotIn(area, [c['template'] for c
+                                in result['components']['components']])
+        loader.save_manifest()
+
+        # The excluded files come back once the pattern is removed
+        loader = self.get_loader(manifest_path=self.manifest_path)
+        result = loader.get_styleguide_components()
+        self.assertIn(area, [c['template'] for c
+                             in result['components']['components']])
+
+    def test_invalid_manifest_is_ignored(self):
+        with open(self.manifest_path, 'w') as manifest_file:
+            manifest_file.write('{"version": 0}')
+
+        loader = self.get_loader(manifest_path=self.manifest_path)
+        loader.get_styleguide_components()
+        self.assertEqual(loader.parsed_files, 5)
+
+    def test_styleguide_index_command(self):
+        stdout = StringIO()
+        call_command('styleguide_index', path=self.manifest_path,
+                     stdout=stdout)
+
+        self.assertTrue(os.path.isfile(self.manifest_path))
+        self.assertIn('components in', stdout.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('styleguide_index', path=None)
+
+
+class NestedFoldersTest(TemporaryStyleguideMixin, TestCase):
+
+    def setUp(self):
+        super(NestedFoldersTest, self).setUp()
+        components_dir = os.path.join(self.template_dirs[0], 'components')
+        for folder in ('forms', os.path.join('forms', 'fields'), 'includes'):
+            os.mkdir(os.path.join(components_dir, folder))
+
+        self.write_template(
+            'templates/styleguide/components/forms/form.html', '<form>')
+        self.write_template(
+            'templates/styleguide/components/forms/fields/input.html',
+            '<input>')
+        self.write_template(
+            'templates/styleguide/components/includes/partial.html', '<p>')
+
+    def test_nested_folders_belong_to_their_module(self):
+        result = self.get_loader().get_styleguide_components()
+
+        self.assertEqual(list(result.keys()), ['components', 'layout'])
+
+        templates = [c['template'] for c in result['components']['components']]
+        self.assertEqual(templates, [
+            os.path.join('styleguide', 'components', '01-bar.html'),
+            os.path.join('styleguide', 'components', '02-area.html'),
+            os.path.join('styleguide', 'components', 'forms', 'form.html'),
+            os.path.join('styleguide', 'components', 'forms', 'fields',
+                         'input.html'),
+        ])
+
+        ids = [c['id'] for c in result['components']['components']]
+        self.assertEqual(ids, ['bar', 'area', 'forms-form',
+                               'forms-fields-input'])
+        links = [c['link'] for c in result['components']['components']]
+        self.assertEqual(links[-1],
+                         STYLEGUIDE_URL + 'components#forms-fields-input')
+
+    def test_same_file_name_in_sub_folders(self):
+        self.write_template(
+            'templates/styleguide/components/forms/fields/form.html',
+            '<form>')
+        styleguide = Styleguide(lazy=False)
+        styleguide._loader = self.get_loader()
+
+        module = styleguide.get_module('components')
+        self.assertEqual(module.get_component('forms-form').template,
+                         os.path.join('styleguide', 'components', 'forms',
+                                      'form.html'))
+        self.assertEqual(module.get_component('forms-fields-form').template,
+                         os.path.join('styleguide', 'components', 'forms',
+                                      'fields', 'form.html'))
+
+    def test_links_to_folders_are_not_followed(self):
+        os.symlink(self.template_dirs[0],
+                   os.path.join(self.template_dirs[0], 'components', 'forms',
+                                'loop'))
+        result = self.get_loader().get_styleguide_components()
+
+        self.assertEqual(len(result['components']['components']), 4)
+
+    def get_templates(self, path_filter):
+        loader = self.get_loader(path_filter=path_filter)
+        result = loader.get_styleguide_components()
+        templates = [c['template'] for module in result.values()
+                     for c in module['components']]
+        return templates, loader
+
+    def test_excluded_folders_are_not_entered(self):
+        node_modules = os.path.join(self.template_dirs[0], 'components',
+                                    'node_modules')
+        os.mkdir(node_modules)
+        self.write_template(
+            'templates/styleguide/components/node_modules/readme.html', '')
+
+        templates, loader = self.get_templates(PathFilter(
+            exclude=('node_modules', 'components/forms/fields', '0*.html')))
+
+        self.assertEqual(templates, [
+            os.path.join('styleguide', 'components', 'forms', 'form.html'),
+            os.path.join('styleguide', 'layout', 'footer.html'),
+            os.path.join('styleguide', 'layout', 'header.html'),
+        ])
+        self.assertNotIn(node_modules, loader.scanned.dirs)
+        self.assertNotIn(os.path.join(self.template_dirs[0], 'components',
+                                      'forms', 'fields'),
+                         loader.scanned.dirs)
+
+        # The fingerprint does not enter them either
+        fingerprint = loader.get_fingerprint()
+        self.write_template(
+            'templates/styleguide/components/node_modules/readme.html', 'new')
+        self.assertEqual(loader.get_fingerprint(), fingerprint)
+
+    def test_only_included_folders_are_entered(self):
+        templates, loader = self.get_templates(PathFilter(
+            include=('/components/forms', )))
+
+        self.assertEqual(templates, [
+            os.path.join('styleguide', 'components', 'forms', 'form.html'),
+            os.path.join('styleguide', 'components', 'forms', 'fields',
+                         'input.html'),
+        ])
+        self.assertNotIn(os.path.join(self.template_dirs[1], 'layout'),
+                         loader.scanned.dirs)
+
+    def test_template_extensions(self):
+        self.write_template('templates/styleguide/components/card.jinja',
+                            '{% comment %}@name card{% endcomment %}')
+        self.write_template('templates/styleguide/components/notes.txt', '')
+
+        templates, loader = self.get_templates(PathFilter())
+        self.assertNotIn(
+            os.path.join('styleguide', 'components', 'card.jinja'), templates)
+
+        loader = self.get_loader(path_filter=PathFilter(
+            extensions=('.html', '.jinja')))
+        result = loader.get_styleguide_components()
+        components = result['components']['components']
+        self.assertEqual([(c['id'], c['file_name']) for c in components], [
+            ('bar', '01-bar.html'),
+            ('area', '02-area.html'),
+            ('card', 'card.jinja'),
+            ('forms-form', 'form.html'),
+            ('forms-fields-input', 'input.html'),
+        ])
+
+
+class PathFilterTest(TestCase):
+
+    def test_exclude(self):
+        path_filter = PathFilter(exclude=('node_modules', 'layout/*.html',
+                                          'a/**/c'))
+
+        self.assertFalse(path_filter.allows_folder('node_modules'))
+        self.assertFalse(path_filter.allows_folder('a/b/node_modules'))
+        self.assertTrue(path_filter.allows_folder('a/node_modules_old'))
+        self.assertFalse(path_filter.allows_file('layout/footer.html'))
+        self.assertTrue(path_filter.allows_file('layout/sub/footer.html'))
+        self.assertFalse(path_filter.allows_folder('a/c'))
+        self.assertFalse(path_filter.allows_folder('a/b/b/c'))
+        self.assertTrue(path_filter.allows_folder('b/c'))
+
+    def test_include(self):
+        path_filter = PathFilter(include=('forms/**/*.html', '/layout'))
+
+        self.assertTrue(path_filter.allows_folder('forms'))
+        self.assertTrue(path_filter.allows_folder('forms/fields'))
+        self.assertTrue(path_filter.allows_folder('layout/sub'))
+        self.assertFalse(path_filter.allows_folder('buttons'))
+        self.assertTrue(path_filter.allows_file('forms/fields/input.html'))
+        self.assertTrue(path_filter.allows_file('layout/sub/footer.html'))
+        self.assertFalse(path_filter.allows_file('buttons/button.html'))
+        # Not a component, only the extension and exclude apply
+        self.assertTrue(path_filter.allows_file('index.html'))
+        self.assertFalse(path_filter.allows_file('forms/form.txt'))
+
+        # Matches anywhere, so no folder can be left out
+        self.assertTrue(PathFilter(include=('layout', ))
+                        .allows_folder('buttons'))
+
+    def test_strip_extension(self):
+        path_filter = PathFilter(extensions=('.html', '.jinja'))
+        self.assertEqual(path_filter.strip_extension('card.jinja'), 'card')
+        self.assertEqual(path_filter.strip_extension('card.txt'), 'card.txt')
+
+
+class WarmUpTest(TemporaryStyleguideMixin, TestCase):
+
+    def get_engine(self):
+        return Engine(
+            dirs=[os.path.dirname(path) for path in self.template_dirs],
+            loaders=[('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader'])])
+
+    def test_templates_are_cached(self):
+        engine = self.get_engine()
+        results = warm_up(self.get_loader(), engine)
+
+        self.assertEqual([(name, error) for name, seconds, error in results], [
+            (os.path.join('styleguide', 'components', '01-bar.html'), None),
+            (os.path.join('styleguide', 'components', '02-area.html'), None),
+            (os.path.join('styleguide', 'layout', 'footer.html'), None),
+            (os.path.join('styleguide', 'layout', 'header.html'), None),
+        ])
+        self.assertEqual(len(engine.template_loaders[0].get_template_cache), 4)
+
+    def test_broken_templates_are_reported(self):
+        self.write_template('other_templates/styleguide/layout/footer.html',
+                            '{% if %}')
+        results = warm_up(self.get_loader(), self.get_engine())
+
+        errors = [(name, type(error)) for name, seconds, error in results
+                  if error is not None]
+        self.assertEqual(errors, [
+            (os.path.join('styleguide', 'layout', 'footer.html'),
+             TemplateSyntaxError),
+        ])
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('styleguide_warmup', stdout=stdout)
+        self.assertIn('4 templates compiled', stdout.getvalue())
+
+    def test_only_servers_warm_up_at_startup(self):
+        config = apps.get_app_config('styleguide')
+        started = []
+        config.warm_up = lambda: started.append(sys.argv[-1])
+        self.addCleanup(delattr, config, 'warm_up')
+        self.addCleanup(setattr, sys, 'argv', sys.argv)
+
+        with self.settings(STYLEGUIDE_WARM_UP=True):
+            for argv in (['manage.py', 'migrate'],
+                         ['manage.py', 'styleguide_warmup'],
+                         ['django-admin', 'shell'],
+                         ['manage.py', 'runserver', '--noreload'],
+                         ['gunicorn', 'project.wsgi']):
+                sys.argv = argv
+                config.ready()
+
+        self.assertEqual(started, ['--noreload', 'project.wsgi'])
+
+
+class DependencyGraphTest(TemporaryStyleguideMixin, TestCase):
+
+    bar = os.path.join('styleguide', 'components', '01-bar.html')
+    area = os.path.join('styleguide', 'components', '02-area.html')
+    icon = 'styleguide/includes/icon.html'
+    svg = 'styleguide/includes/svg.html'
+
+    def setUp(self):
+        super(DependencyGraphTest, self).setUp()
+        os.mkdir(os.path.join(self.template_dirs[0], 'includes'))
+        self.write_template('templates/styleguide/includes/icon.html',
+                            '<i>{% include "styleguide/includes/svg.html" %}'
+                            '</i>')
+        self.write_template('templates/styleguide/includes/svg.html',
+                            '<svg></svg>')
+        self.write_template('templates/styleguide/components/01-bar.html',
+                            '{% comment %}@name bar{% endcomment %}'
+                            '{% include "styleguide/includes/icon.html" %}'
+                            '{% include "missing.html" %}')
+
+    def get_graph(self, loader=None):
+        loader = loader or self.get_loader()
+        loader.get_styleguide_components()
+        return loader.scanned.get_dependency_graph()
+
+    def test_extract_dependencies(self):
+        self.assertEqual(extract_dependencies(
+            "{% extends 'base.html' %}{% include \"a.html\" with x=1 %}"
+            "{% include name %}{%include 'a.html'%}"),
+            ['base.html', 'a.html'])
+
+    def test_graph(self):
+        graph = self.get_graph()
+
+        self.assertEqual(graph.get_dependencies(self.bar),
+                         ['missing.html', self.icon, self.svg])
+        self.assertEqual(graph.get_dependencies(self.area), [])
+        self.assertEqual(graph.get_dependents(self.svg), [self.bar])
+        self.assertEqual(graph.get_dependents(self.bar), [])
+        self.assertEqual(graph.get_affected_components([
+            os.path.join(self.template_dirs[0], 'includes', 'svg.html'),
+        ]), [self.bar])
+
+    def test_edited_partial_changes_only_its_components(self):
+        graph = self.get_graph()
+        self.write_template('templates/styleguide/includes/svg.html',
+                            '<svg><path/></svg>')
+        new_graph = self.get_graph()
+
+        self.assertNotEqual(graph.get_version(self.bar),
+                            new_graph.get_version(self.bar))
+        self.assertEqual(graph.get_version(self.area),
+                         new_graph.get_version(self.area))
+
+    def test_dependencies_are_kept_in_the_manifest(self):
+        manifest_path = os.path.join(self.tmp_dir, 'manifest.json')
+        loader = self.get_loader(manifest_path=manifest_path)
+        graph = self.get_graph(loader)
+        loader.save_manifest()
+
+        self.write_template('templates/styleguide/includes/svg.html',
+                            '<svg><path/></svg>')
+        loader = self.get_loader(manifest_path=manifest_path)
+        read = []
+        read_file = loader._read_file
+        loader._read_file = lambda path: read.append(path) or read_file(path)
+        new_graph = self.get_graph(loader)
+
+        self.assertEqual(read, [os.path.join(self.template_dirs[0],
+                                             'includes', 'svg.html')])
+        self.assertEqual(loader.parsed_files, 0)
+        self.assertEqual(new_graph.get_dependencies(self.bar),
+                         graph.get_dependencies(self.bar))
+
+    def test_each_file_is_read_once(self):
+        loader = self.get_loader()
+        read = []
+        read_file = loader._read_file
+        loader._read_file = lambda path: read.append(path) or read_file(path)
+        self.get_graph(loader)
+
+        self.assertEqual(sorted(read), sorted(set(read)))
+        self.assertEqual(len(loader.scanned.get_dependency_graph().templates),
+                         6)
+
+    def test_styleguide_manifest(self):
+        styleguide = Styleguide(lazy=False)
+        styleguide._loader = self.get_loader()
+        manifest = styleguide.to_manifest()
+
+        graph = Styleguide.from_manifest(manifest).get_dependency_graph()
+        self.assertEqual(graph.get_dependents(self.icon), [self.bar])
+        self.assertEqual(graph.get_version(self.bar),
+                         styleguide.get_dependency_graph().get_version(
+                             self.bar))
+
+        # Only what the versions need
+        self.assertEqual(sorted(manifest['dependencies']),
+                         [self.bar, self.icon, self.svg])
+        self.assertNotIn('path', manifest['dependencies'][self.bar])
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('styleguide_dependencies', stdout=stdout)
+        self.assertIn('styleguide/components/01-bar.html', stdout.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('styleguide_dependencies', template='missing.html')
+
+
+@unittest.skipIf(futures is None, "needs concurrent.futures")
+class ParallelScanTest(TemporaryStyleguideMixin, TestCase):
+
+    def setUp(self):
+        super(ParallelScanTest, self).setUp()
+        for index in range(20):
+            self.write_template(
+                'templates/styleguide/components/%02d-item.html' % (index + 3),
+                '{%% comment %%}@name item %s{%% endcomment %%}' % index)
+
+    def test_same_result_as_serial_scan(self):
+        expected_result = self.get_loader().get_styleguide_components()
+
+        for executor in ('thread', 'process'):
+            loader = self.get_loader(workers=4, executor=executor)
+            result = loader.get_styleguide_components()
+
+            self.assertEqual(result, expected_result)
+            self.assertEqual(list(result.keys()),
+                             list(expected_result.keys()))
+            self.assertEqual(loader.parsed_files, 25)
+
+    def test_pool_is_reused(self):
+        self.get_loader(workers=3).get_styleguide_components()
+        executor = utils._executors[('thread', 3)]
+
+        self.write_template('templates/styleguide/components/03-item.html',
+                            '{% comment %}@name changed{% endcomment %}')
+        result = self.get_loader(workers=3).get_styleguide_components()
+        self.assertIs(utils._executors[('thread', 3)], executor)
+        self.assertEqual(result['components']['components'][2]['name'],
+                         'changed')
+
+    def test_invalid_executor(self):
+        loader = self.get_loader(workers=4, executor='fork')
+        with self.assertRaises(ImproperlyConfigured):
+            loader.get_styleguide_components()
+
+
+class FingerprintTest(TemporaryStyleguideMixin, TestCase):
+
+    def test_get_fingerprint(self):
+        loader = self.get_loader()
+        fingerprint = loader.get_fingerprint()
+        self.assertEqual(loader.get_fingerprint(), fingerprint)
+
+        self.write_template('templates/styleguide/components/01-bar.html',
+                            '<div class="bar"></div>')
+        changed_fingerprint = loader.get_fingerprint()
+        self.assertNotEqual(changed_fingerprint, fingerprint)
+
+        self.write_template('templates/styleguide/components/03-new.html',
+                            '<div></div>')
+        self.assertNotEqual(loader.get_fingerprint(), changed_fingerprint)
+
+
 class StyleguideTest(TestCase):
 
     def setUp(self):
@@ -152,17 +769,348 @@ class StyleguideTest(TestCase):
         # And we are in the index page
         self.assertEqual(self.styleguide.is_index(), True)
 
-        expected_result = self.styleguide.modules[0]
+        expected_result = self.styleguide.modules[1]
         self.styleguide.set_current_module('layout')
         self.assertEqual(self.styleguide.current_module, expected_result)
 
         # current_components
-        expected_result = self.styleguide.modules[0].components
+        expected_result = self.styleguide.modules[1].components
         self.assertEqual(self.styleguide.current_components, expected_result)
 
         # Not index page anymore
         self.assertEqual(self.styleguide.is_index(), False)
 
+    def test_get_module(self):
+        layout = self.styleguide.get_module('layout')
+        self.assertEqual(layout.name, 'layout')
+        self.assertIs(layout, self.styleguide.modules[1])
+        self.assertEqual(self.styleguide.get_module('nothing'), None)
+
+    def test_set_current_component(self):
+        self.assertEqual(self.styleguide.current_component, None)
+
+        self.styleguide.set_current_component('layout', 'header')
+        self.assertEqual(self.styleguide.current_module.name, 'layout')
+        self.assertEqual(self.styleguide.current_component.name, 'header')
+
+        self.styleguide.set_current_component('layout', 'bar')
+        self.assertEqual(self.styleguide.current_component, None)
+
+        self.styleguide.set_current_component('nothing', 'bar')
+        self.assertEqual(self.styleguide.current_module, None)
+        self.assertEqual(self.styleguide.current_component, None)
+
+    def test_items(self):
+        items = self.styleguide.items
+        self.assertEqual(list(items.keys()), ['components', 'layout'])
+        self.assertEqual([c['name'] for c in items['layout']],
+                         ['footer', 'header'])
+        self.assertIs(self.styleguide.items, items)
+
+
+class StyleguideRecordTest(TestCase):
+
+    def setUp(self):
+        self.styleguide = Styleguide()
+
+    def test_records_are_immutable(self):
+        component = self.styleguide.components[0]
+        with self.assertRaises(AttributeError):
+            component.name = 'other'
+
+        module = self.styleguide.modules[0]
+        with self.assertRaises(AttributeError):
+            module.components = []
+
+    def test_to_dict(self):
+        component = self.styleguide.get_module('layout').components[0]
+        self.assertEqual(component.to_dict(), {
+            'id': 'footer', 'file_name': 'footer.html', 'name': 'footer',
+            'template': 'styleguide/layout/footer.html', 'doc': {},
+            'link': STYLEGUIDE_URL + 'layout#footer',
+            'page': STYLEGUIDE_URL + 'layout/footer/'})
+
+        module = self.styleguide.get_module('layout')
+        self.assertEqual(sorted(module.to_dict().keys()),
+                         ['components', 'doc', 'id', 'link', 'name'])
+
+    def test_pickle(self):
+        modules = pickle.loads(pickle.dumps(self.styleguide.modules))
+        self.assertEqual(modules, self.styleguide.modules)
+        self.assertEqual(modules[1].get_component('header').name, 'header')
+
+
+class StyleguideManifestTest(TemporaryStyleguideMixin, TestCase):
+
+    def get_styleguide(self, lazy):
+        styleguide = Styleguide(lazy=lazy)
+        styleguide._loader = self.get_loader()
+        return styleguide
+
+    def test_to_manifest_and_back(self):
+        styleguide = self.get_styleguide(lazy=False)
+        styleguide.fingerprint = 'abc'
+        manifest = styleguide.to_manifest()
+
+        result = Styleguide.from_manifest(pickle.loads(pickle.dumps(manifest)))
+
+        self.assertEqual(result.fingerprint, 'abc')
+        self.assertEqual([m.name for m in result.modules],
+                         ['components', 'layout'])
+        self.assertEqual([c.to_dict() for c in result.components],
+                         [c.to_dict() for c in styleguide.components])
+        self.assertEqual(result.modules[1].doc,
+                         {'description': 'yada yada yada'})
+
+    def test_lazy_modules_stay_lazy(self):
+        styleguide = self.get_styleguide(lazy=True)
+        styleguide.modules[1].components
+        manifest = styleguide.to_manifest()
+
+        self.assertNotIn('components', manifest['modules'][0])
+        self.assertEqual(len(manifest['modules'][1]['components']), 2)
+
+        result = Styleguide.from_manifest(manifest)
+        self.assertEqual([c.name for c in result.components],
+                         ['bar', 'layout area', 'footer', 'header'])
+
+    def test_etag(self):
+        etag = self.get_styleguide(lazy=False).get_etag()
+        self.assertEqual(self.get_styleguide(lazy=False).get_etag(), etag)
+        self.assertEqual(self.get_styleguide(lazy=True).get_etag(), None)
+
+        self.write_template(
+            'other_templates/styleguide/layout/header.html',
+            '<header>new markup</header>')
+        styleguide = self.get_styleguide(lazy=False)
+        self.assertNotEqual(styleguide.get_etag(), etag)
+        self.assertEqual(
+            Styleguide.from_manifest(styleguide.to_manifest()).get_etag(),
+            styleguide.get_etag())
+
+
+class LazyStyleguideTest(TemporaryStyleguideMixin, TestCase):
+
+    def get_styleguide(self, lazy):
+        styleguide = Styleguide(lazy=lazy)
+        styleguide._loader = self.get_loader()
+        return styleguide
+
+    def test_modules_are_scanned_when_used(self):
+        styleguide = self.get_styleguide(lazy=True)
+        loader = styleguide._loader
+
+        self.assertEqual([m.name for m in styleguide.modules],
+                         ['components', 'layout'])
+        self.assertEqual(loader.parsed_files, 0)
+
+        styleguide.set_current_module('layout')
+        self.assertEqual(loader.parsed_files, 0)
+
+        names = [c.name for c in styleguide.current_components]
+        self.assertEqual(names, ['footer', 'header'])
+        self.assertEqual(styleguide.current_module.doc,
+                         {'description': 'yada yada yada'})
+        # footer, header and the doc file
+        self.assertEqual(loader.parsed_files, 3)
+
+        # memoized
+        styleguide.current_module.components
+        self.assertEqual(loader.parsed_files, 3)
+
+    def test_same_result_as_eager(self):
+        eager = self.get_styleguide(lazy=False)
+        lazy = self.get_styleguide(lazy=True)
+
+        self.assertEqual([m.to_dict() for m in lazy.modules],
+                         [m.to_dict() for m in eager.modules])
+        self.assertEqual([c.to_dict() for c in lazy.components],
+                         [c.to_dict() for c in eager.components])
+
+
+class StyleguideWatcherTest(TemporaryStyleguideMixin, TestCase):
+
+    def setUp(self):
+        super(StyleguideWatcherTest, self).setUp()
+        cache.clear()
+        self.watcher = StyleguideWatcher(interval=0.01,
+                                         loader=self.get_loader())
+        self.addCleanup(self.watcher.stop)
+
+    def get_component(self, module_id, component_id):
+        styleguide = Styleguide.from_manifest(self.watcher.manifest)
+        return styleguide.get_module(module_id).get_component(component_id)
+
+    def test_edited_component_is_parsed_alone(self):
+        self.assertTrue(self.watcher.refresh())
+        self.assertFalse(self.watcher.refresh())
+        manifest = self.watcher.manifest
+        loader = self.watcher.loader
+        parsed_files = loader.parsed_files
+
+        self.write_template(
+            'other_templates/styleguide/layout/footer.html',
+            '{% comment %}@name new footer{% endcomment %}')
+        self.assertTrue(self.watcher.refresh())
+
+        self.assertEqual(loader.parsed_files, parsed_files + 1)
+        self.assertEqual(self.get_component('layout', 'footer').name,
+                         'new footer')
+        self.assertEqual(cache.get(STYLEGUIDE_CACHE_KEY)['etag'],
+                         self.watcher.manifest['etag'])
+        # The previous manifest is left as it was
+        self.assertNotEqual(manifest, self.watcher.manifest)
+
+    def test_added_component_is_scanned(self):
+        self.watcher.refresh()
+        self.write_template('other_templates/styleguide/layout/menu.html',
+                            '<nav></nav>')
+        dir_path = os.path.join(self.template_dirs[1], 'layout')
+        mtime = os.stat(dir_path).st_mtime + 10
+        os.utime(dir_path, (mtime, mtime))
+        self.assertTrue(self.watcher.refresh())
+
+        self.assertEqual(self.get_component('layout', 'menu').name, 'menu')
+        # Only the new file is parsed
+        self.assertEqual(self.watcher.loader.parsed_files, 1)
+
+    def test_edited_partial_is_not_parsed(self):
+        os.mkdir(os.path.join(self.template_dirs[1], 'includes'))
+        self.write_template('other_templates/styleguide/includes/logo.html',
+                            '<img>')
+        self.write_template('other_templates/styleguide/layout/header.html',
+                            '{% include "styleguide/includes/logo.html" %}')
+        self.watcher.refresh()
+        manifest = self.watcher.manifest
+        parsed_files = self.watcher.loader.parsed_files
+
+        self.write_template('other_templates/styleguide/includes/logo.html',
+                            '<img alt="logo">')
+        self.assertTrue(self.watcher.refresh())
+
+        self.assertEqual(self.watcher.loader.parsed_files, parsed_files)
+        versions = []
+        for data in (manifest, self.watcher.manifest):
+            graph = Styleguide.from_manifest(data).get_dependency_graph()
+            versions.append([graph.get_version(template) for template in (
+                os.path.join('styleguide', 'layout', 'header.html'),
+                os.path.join('styleguide', 'layout', 'footer.html'))])
+
+        self.assertNotEqual(versions[0][0], versions[1][0])
+        self.assertEqual(versions[0][1], versions[1][1])
+        self.assertNotEqual(manifest['etag'], self.watcher.manifest['etag'])
+
+    def test_thread_starts_and_stops(self):
+        self.watcher.start()
+        self.watcher.start()
+        self.assertTrue(self.watcher.is_running())
+
+        thread = self.watcher._thread
+        thread_count = len([t for t in threading.enumerate()
+                            if t.name == 'styleguide-watcher'])
+        self.assertEqual(thread_count, 1)
+
+        self.watcher._stopped.wait(0.5)
+        self.watcher.stop()
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.watcher.manifest, None)
+
+    def test_views_use_the_watcher_manifest(self):
+        self.watcher.refresh()
+        manifest = copy.deepcopy(self.watcher.manifest)
+        manifest['modules'][0]['name'] = 'watched'
+
+        self.addCleanup(setattr, watcher, 'manifest', None)
+        watcher.manifest = manifest
+
+        user = UserFactory(is_staff=True)
+        self.client.login(username=user.username, password=USER_PASSWORD)
+        response = self.client.get(STYLEGUIDE_URL)
+        self.assertContains(response, 'Module: watched')
+
+
+class SearchIndexTest(TestCase):
+
+    def setUp(self):
+        self.modules = [
+            {'id': 'forms', 'name': 'forms', 'components': [
+                {'id': 'button', 'name': 'button',
+                 'doc': {'description': 'A primary action'}},
+                {'id': 'text-input', 'name': 'text input',
+                 'doc': {'description': 'Next to a button'}},
+            ]},
+            {'id': 'layout', 'name': 'layout', 'path': '/not/scanned'},
+            {'id': 'navigation', 'name': 'navigation', 'components': [
+                {'id': 'menu', 'name': 'menu', 'doc': {
+                    'description': 'Buttons for the forms',
+                    'deprecated': ''}},
+            ]},
+        ]
+        self.index = SearchIndex.build(self.modules)
+
+    def test_ranking(self):
+        # name, then doc, then a prefix of the doc
+        self.assertEqual(self.index.search('button'), [
+            ('forms', 'button'),
+            ('forms', 'text-input'),
+            ('navigation', 'menu'),
+        ])
+        self.assertEqual(self.index.search('button', limit=1),
+                         [('forms', 'button')])
+
+    def test_every_word_matches(self):
+        self.assertEqual(self.index.search('BUTT for'), [
+            ('forms', 'button'),
+            ('forms', 'text-input'),
+            ('navigation', 'menu'),
+        ])
+        self.assertEqual(self.index.search('text primary'), [])
+        self.assertEqual(self.index.search('deprecated'),
+                         [('navigation', 'menu')])
+        self.assertEqual(self.index.search('  '), [])
+
+    def test_to_dict_and_back(self):
+        data = pickle.loads(pickle.dumps(self.index.to_dict()))
+        index = SearchIndex.from_dict(data, self.modules)
+        self.assertEqual(index.search('inp'), [('forms', 'text-input')])
+        self.assertEqual(index.tokens, self.index.tokens)
+
+
+class TestSearchView(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = UserFactory(is_staff=True)
+        self.client.login(username=user.username, password=USER_PASSWORD)
+        self.url = reverse('styleguide.search')
+
+    def test_search(self):
+        response = self.client.get(self.url, {'q': 'foot'})
+        self.assertContains(response, reverse(
+            'styleguide.component_page', args=('layout', 'footer')))
+        self.assertNotContains(response, reverse(
+            'styleguide.component_page', args=('layout', 'header')))
+
+        response = self.client.get(self.url, {'q': 'nothing'})
+        self.assertContains(response, 'layout area')
+
+        response = self.client.get(self.url, {'q': 'missing'})
+        self.assertContains(response, 'No component found')
+
+    def test_index_is_cached(self):
+        self.client.get(self.url, {'q': 'foot'})
+        manifest = cache.get(STYLEGUIDE_CACHE_KEY)
+        index = SearchIndex.from_dict(manifest['search'], manifest['modules'])
+        self.assertEqual(index.components,
+                         [['components', 'bar'], ['components', 'area'],
+                          ['layout', 'footer'], ['layout', 'header']])
+        self.assertEqual(index.search('foot'), [('layout', 'footer')])
+
+    def test_lazy_styleguide(self):
+        styleguide = Styleguide(lazy=True)
+        self.assertEqual([(m.id, c.id) for m, c in styleguide.search('he')],
+                         [('layout', 'header')])
+
 
 class TestIndexView(TestCase):
 
@@ -180,3 +1128,715 @@ class TestIndexView(TestCase):
         user = UserFactory()
         response = self.client.get(url)
         self.assertEqual(response.status_code, 404)
+
+
+class TestConditionalGet(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = UserFactory(is_staff=True)
+        self.client.login(username=user.username, password=USER_PASSWORD)
+
+    def test_not_modified(self):
+        response = self.client.get(STYLEGUIDE_URL)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        response = self.client.get(STYLEGUIDE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(STYLEGUIDE_URL,
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(STYLEGUIDE_URL, HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_access_comes_first(self):
+        etag = self.client.get(STYLEGUIDE_URL)['ETag']
+        self.client.logout()
+
+        response = self.client.get(STYLEGUIDE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+    def test_missing_module_is_not_modified(self):
+        etag = self.client.get(STYLEGUIDE_URL)['ETag']
+        url = reverse('styleguide.module', args=('missing', ))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+
+class TestStreamingViews(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = UserFactory(is_staff=True)
+        self.client.login(username=user.username, password=USER_PASSWORD)
+
+    def set_view_setting(self, name, value):
+        self.addCleanup(setattr, views, name, getattr(views, name))
+        setattr(views, name, value)
+
+    def get_content(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            content = b''.join(response.streaming_content)
+        else:
+            content = response.content
+        return response, ' '.join(content.decode('utf-8').split())
+
+    def test_same_pages_when_streamed(self):
+        urls = [STYLEGUIDE_URL,
+                reverse('styleguide.module', args=('layout', ))]
+
+        rendered = {}
+        for url in urls:
+            response, rendered[url] = self.get_content(url)
+            self.assertFalse(response.streaming)
+
+        self.set_view_setting('STYLEGUIDE_STREAMING', True)
+        for url in urls:
+            response, streamed = self.get_content(url)
+            self.assertTrue(response.streaming)
+            self.assertEqual(streamed, rendered[url])
+            self.assertIn('Module: layout', streamed)
+            self.assertIn('href="%s"' % reverse(
+                'styleguide.component_page', args=('layout', 'footer')),
+                streamed)
+
+    def test_page_without_sections_is_rendered_once(self):
+        self.set_view_setting('STYLEGUIDE_STREAMING', True)
+        renders = []
+
+        def receive_phase(sender, phase, **kwargs):
+            renders.append(phase)
+        phase_finished.connect(receive_phase)
+        self.addCleanup(phase_finished.disconnect, receive_phase)
+
+        request = RequestFactory().get(STYLEGUIDE_URL)
+        request.user = UserFactory(is_staff=True)
+        styleguide = Styleguide()
+        response = views.render_page(
+            request, views.COMPONENT_TEMPLATE,
+            views.get_component_context(styleguide, 'layout', 'footer'),
+            (views.MODULE_COMPONENT_TEMPLATE, []))
+
+        self.assertFalse(response.streaming)
+        self.assertContains(response, 'footer')
+        self.assertEqual(renders.count('render'), 1)
+
+    def test_context_processors_run_once(self):
+        self.set_view_setting('STYLEGUIDE_STREAMING', True)
+        calls = []
+
+        def processor(request):
+            calls.append(request)
+            return {}
+
+        engine = Engine.get_default()
+        self.addCleanup(setattr, engine, 'template_context_processors',
+                        engine.template_context_processors)
+        engine.template_context_processors += (processor, )
+
+        response, streamed = self.get_content(
+            reverse('styleguide.module', args=('layout', )))
+        self.assertIn('Module: layout', streamed)
+        # The page and the sections, not once per section
+        self.assertEqual(len(calls), 2)
+
+    def test_not_modified_is_not_streamed(self):
+        self.set_view_setting('STYLEGUIDE_STREAMING', True)
+        response = self.client.get(STYLEGUIDE_URL)
+        etag = response['ETag']
+
+        response = self.client.get(STYLEGUIDE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class TestComponentsJson(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = UserFactory(is_staff=True)
+        self.client.login(username=user.username, password=USER_PASSWORD)
+        self.url = reverse('styleguide.components_json')
+
+    def get_json(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            content = b''.join(response.streaming_content)
+        else:
+            content = response.content
+        return json.loads(content.decode('utf-8'))
+
+    def get_names(self, data):
+        return [(module['id'], [c['name'] for c in module['components']])
+                for module in data['modules']]
+
+    def test_full_dump_is_streamed(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+
+        data = self.get_json()
+        self.assertEqual(self.get_names(data), [
+            ('components', ['bar', 'layout area']),
+            ('layout', ['footer', 'header']),
+        ])
+        self.assertEqual(data['next'], None)
+        self.assertEqual(data['modules'][1]['doc'],
+                         {'description': 'yada yada yada'})
+
+        footer = data['modules'][1]['components'][0]
+        self.assertEqual(footer['link'], '/layout#footer')
+        self.assertEqual(footer['page'], reverse(
+            'styleguide.component_page', args=('layout', 'footer')))
+
+    def test_module_filter(self):
+        data = self.get_json(module='layout')
+        self.assertEqual(self.get_names(data),
+                         [('layout', ['footer', 'header'])])
+
+    def test_cursor_pagination(self):
+        pages = []
+        data = self.get_json(limit=3)
+        pages.append(self.get_names(data))
+        while data['next'] is not None:
+            data = self.get_json(limit=3, cursor=data['next'])
+            pages.append(self.get_names(data))
+
+        self.assertEqual(pages, [
+            [('components', ['bar', 'layout area']), ('layout', ['footer'])],
+            [('layout', ['header'])],
+        ])
+
+    def test_cursor_without_limit_is_streamed(self):
+        cursor = self.get_json(limit=1)['next']
+        response = self.client.get(self.url, {'cursor': cursor})
+        self.assertTrue(response.streaming)
+
+        data = self.get_json(cursor=cursor)
+        self.assertEqual(self.get_names(data), [
+            ('components', ['layout area']),
+            ('layout', ['footer', 'header']),
+        ])
+
+    def test_bad_parameters(self):
+        removed = views.encode_cursor((Styleguide().get_module('layout'),
+                                       StyleguideComponent({'id': 'gone'})))
+        for params in ({'limit': 'a'}, {'limit': 0}, {'cursor': 'nope'},
+                       {'cursor': 'WyJ4IiwgbnVsbF0'}, {'cursor': removed}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_cursor_skips_the_modules_before_it(self):
+        styleguide = Styleguide(lazy=True)
+        items = views.get_json_items(styleguide, [], ('layout', 'header'))
+
+        self.assertEqual([(module.id, component.id)
+                          for module, component in items],
+                         [('layout', 'header')])
+        self.assertFalse(styleguide.get_module('components').is_loaded())
+
+    def test_access(self):
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+
+
+class TestScopedViews(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = UserFactory(is_staff=True)
+        self.client.login(username=user.username, password=USER_PASSWORD)
+
+    def test_index_links_to_pages(self):
+        response = self.client.get(STYLEGUIDE_URL)
+
+        self.assertContains(response, reverse('styleguide.module',
+                                              args=('layout', )))
+        self.assertContains(response, reverse('styleguide.component_page',
+                                              args=('layout', 'footer')))
+        self.assertNotContains(response, 'this is the footer')
+
+    def test_module(self):
+        url = reverse('styleguide.module', args=('layout', ))
+        response = self.client.get(url)
+
+        self.assertEqual(response.context['module'].name, 'layout')
+        self.assertContains(response, 'this is the footer')
+        self.assertContains(response, 'This is a header')
+        self.assertNotContains(response, 'this is a bar')
+
+        url = reverse('styleguide.module', args=('nothing', ))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_component(self):
+        url = reverse('styleguide.component_page', args=('components', 'area'))
+        response = self.client.get(url)
+
+        self.assertEqual(response.context['component'].name, 'layout area')
+        self.assertContains(response, 'Nothing more than an area')
+        self.assertContains(response, 'area-content')
+        self.assertNotContains(response, 'this is a bar')
+
+        url = reverse('styleguide.component_page', args=('components', 'x'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_access(self):
+        self.client.logout()
+        for url in (reverse('styleguide.module', args=('layout', )),
+                    reverse('styleguide.component_page',
+                            args=('layout', 'footer'))):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class FragmentCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        fragment_cache.clear()
+        self.component = StyleguideComponent({'template': 'component.html'})
+
+    def render(self, component_source, **context):
+        engine = Engine(
+            loaders=[('django.template.loaders.locmem.Loader', {
+                'page.html': '{% load styleguide_tags %}'
+                             '{% styleguide_component component %}',
+                'component.html': component_source,
+            })],
+            libraries={
+                'styleguide_tags': 'styleguide.templatetags.styleguide_tags',
+            })
+        context['component'] = self.component
+        return engine.get_template('page.html').render(Context(context))
+
+    def enable_cache(self):
+        self.addCleanup(setattr, fragments, 'STYLEGUIDE_FRAGMENT_CACHE',
+                        fragments.STYLEGUIDE_FRAGMENT_CACHE)
+        fragments.STYLEGUIDE_FRAGMENT_CACHE = True
+
+    def test_users_get_their_own_render(self):
+        first, second = UserFactory(), UserFactory()
+        self.assertEqual(self.render('{{ user.username }}', user=first),
+                         first.username)
+        self.assertEqual(self.render('{{ user.username }}', user=second),
+                         second.username)
+
+    def test_unchanged_component_is_not_rendered_again(self):
+        self.enable_cache()
+        self.assertEqual(self.render('<b>{{ n }}</b>', n=1), '<b>1</b>')
+        self.assertEqual(self.render('<b>{{ n }}</b>', n=2), '<b>1</b>')
+
+        # from the django cache only
+        fragment_cache.clear()
+        self.assertEqual(self.render('<b>{{ n }}</b>', n=3), '<b>1</b>')
+
+    def test_changed_component_is_rendered(self):
+        self.enable_cache()
+        self.assertEqual(self.render('<b>{{ n }}</b>', n=1), '<b>1</b>')
+        self.assertEqual(self.render('<i>{{ n }}</i>', n=2), '<i>2</i>')
+
+    def test_version_of_the_styleguide(self):
+        self.enable_cache()
+        styleguide = Styleguide.from_manifest({
+            'lazy': False, 'fingerprint': None, 'last_modified': None,
+            'etag': None, 'search': None, 'modules': [],
+            'dependencies': {'component.html': {
+                'path': 'component.html', 'mtime': 1, 'size': 1,
+                'component': True, 'dependencies': []}},
+        })
+        self.assertEqual(self.render('<b>{{ n }}</b>', n=1,
+                                     styleguide=styleguide), '<b>1</b>')
+        # Same version, the template is not even loaded
+        self.assertEqual(self.render('{% if %}', n=2,
+                                     styleguide=styleguide), '<b>1</b>')
+
+        styleguide._dependencies['component.html']['mtime'] = 2
+        styleguide._loader.dependency_graph = None
+        self.assertEqual(self.render('<i>{{ n }}</i>', n=3,
+                                     styleguide=styleguide), '<i>3</i>')
+
+    def test_lru(self):
+        fragments = FragmentCache(max_size=2)
+        for key in ('a', 'b', 'c'):
+            fragments.set(key, key)
+            if key == 'b':
+                # now 'a' is the most recently used
+                fragments.get('a')
+
+        self.assertEqual(list(fragments._local.keys()), ['a', 'c'])
+
+
+class StyleguideExporterTest(TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.outdir)
+
+    def read_page(self, *path):
+        with open(os.path.join(self.outdir, *path)) as page:
+            return page.read()
+
+    def test_export(self):
+        stdout = StringIO()
+        call_command('styleguide_export', self.outdir, stdout=stdout)
+
+        self.assertIn('7 pages rendered', stdout.getvalue())
+        self.assertIn('Module: components', self.read_page('index.html'))
+        self.assertIn('this is the footer',
+                      self.read_page('layout', 'index.html'))
+        self.assertIn('area-content',
+                      self.read_page('components', 'area', 'index.html'))
+
+    def test_only_changed_pages_are_rendered(self):
+        exporter = StyleguideExporter(self.outdir)
+        timings, unchanged = exporter.export()
+        self.assertEqual((len(timings), unchanged), (7, 0))
+
+        timings, unchanged = StyleguideExporter(self.outdir).export()
+        self.assertEqual((len(timings), unchanged), (0, 7))
+
+        # A page which is missing or changed since is rendered again
+        os.remove(os.path.join(self.outdir, 'layout', 'footer', 'index.html'))
+        styleguide = Styleguide()
+        styleguide.modules[0].components[1].doc['description'] = 'changed'
+
+        exporter = StyleguideExporter(self.outdir, styleguide=styleguide)
+        timings, unchanged = exporter.export()
+        self.assertEqual(sorted(path for path, seconds in timings), [
+            os.path.join('components', 'area', 'index.html'),
+            os.path.join('components', 'index.html'),
+            'index.html',
+            os.path.join('layout', 'footer', 'index.html'),
+        ])
+
+    def test_pages_using_a_changed_template_are_rendered(self):
+        override_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, override_dir)
+        os.mkdir(os.path.join(override_dir, 'styleguide'))
+        templates = copy.deepcopy(settings.TEMPLATES)
+        templates[0]['DIRS'] = (override_dir, ) + tuple(templates[0]['DIRS'])
+
+        def override(name, marker):
+            source_path = os.path.join(CURRENT_PATH, 'templates',
+                                       'styleguide', name)
+            with open(source_path) as source:
+                contents = source.read().replace('</h1>', '</h1>' + marker)
+            with open(os.path.join(override_dir, 'styleguide', name),
+                      'w') as template:
+                template.write(contents)
+
+        with self.settings(TEMPLATES=templates):
+            override('base.html', 'first base')
+            StyleguideExporter(self.outdir).export()
+
+            override('base.html', 'second base')
+            timings, unchanged = StyleguideExporter(self.outdir).export()
+            self.assertEqual((len(timings), unchanged), (7, 0))
+            self.assertIn('second base', self.read_page('index.html'))
+
+            # Only the index includes it
+            with open(os.path.join(override_dir, 'styleguide',
+                                   'index_module.html'), 'w') as template:
+                template.write('<h2>{{ module.name }}</h2>')
+            timings, unchanged = StyleguideExporter(self.outdir).export()
+            self.assertEqual([path for path, seconds in timings],
+                             ['index.html'])
+
+    @unittest.skipIf(futures is None, "needs concurrent.futures")
+    def test_export_with_workers(self):
+        timings, unchanged = StyleguideExporter(self.outdir,
+                                                workers=4).export()
+        self.assertEqual(len(timings), 7)
+        self.assertIn('this is a bar',
+                      self.read_page('components', 'bar', 'index.html'))
+
+
+class TestIndexViewDebugFingerprint(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.set_view_setting('STYLEGUIDE_DEBUG', True)
+        self.set_view_setting('STYLEGUIDE_DEBUG_FINGERPRINT', True)
+
+        user = UserFactory(is_staff=True)
+        self.client.login(username=user.username, password=USER_PASSWORD)
+
+    def set_view_setting(self, name, value):
+        self.addCleanup(setattr, views, name, getattr(views, name))
+        setattr(views, name, value)
+
+    def test_cached_styleguide_is_reused(self):
+        self.client.get(STYLEGUIDE_URL)
+        manifest = cache.get(STYLEGUIDE_CACHE_KEY)
+        self.assertEqual(manifest['fingerprint'],
+                         StyleguideLoader().get_fingerprint())
+
+        manifest['modules'][0]['name'] = 'reused'
+        styleguide_cache.set(manifest)
+        response = self.client.get(STYLEGUIDE_URL)
+        self.assertContains(response, 'Module: reused')
+
+    def test_cached_styleguide_is_rebuilt_on_change(self):
+        self.client.get(STYLEGUIDE_URL)
+        manifest = cache.get(STYLEGUIDE_CACHE_KEY)
+
+        manifest['fingerprint'] = 'changed'
+        styleguide_cache.set(manifest)
+        self.client.get(STYLEGUIDE_URL)
+        self.assertEqual(cache.get(STYLEGUIDE_CACHE_KEY)['fingerprint'],
+                         StyleguideLoader().get_fingerprint())
+
+    def test_nothing_is_cached_without_fingerprint(self):
+        self.set_view_setting('STYLEGUIDE_DEBUG_FINGERPRINT', False)
+        self.client.get(STYLEGUIDE_URL)
+        self.assertEqual(cache.get(STYLEGUIDE_CACHE_KEY), None)
+
+
+class StyleguideCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.manifest = Styleguide().to_manifest()
+        self.cache = StyleguideCache()
+        self.other_process = StyleguideCache()
+
+    def test_local_styleguide(self):
+        self.assertEqual(self.cache.get(None), None)
+        self.other_process.set(self.manifest)
+
+        styleguide = self.cache.get(None)
+        self.assertEqual([m.name for m in styleguide.modules],
+                         ['components', 'layout'])
+
+        # Only the generation is read from the django cache
+        cache.delete(STYLEGUIDE_CACHE_KEY)
+        styleguide.set_current_module('layout')
+        other = self.cache.get(None)
+        self.assertEqual(other.modules, styleguide.modules)
+        self.assertEqual(other.current_module, None)
+
+        self.assertEqual(self.cache.get('other fingerprint'), None)
+
+    def test_indexes_are_shared(self):
+        self.other_process.set(self.manifest)
+        styleguide = self.cache.get(None)
+        other = self.cache.get(None)
+
+        self.assertIsNot(other, styleguide)
+        self.assertIs(other._module_index, styleguide._module_index)
+        self.assertIs(other.components, styleguide.components)
+        self.assertIs(other.items, styleguide.items)
+        self.assertIs(other.get_dependency_graph(),
+                      styleguide.get_dependency_graph())
+
+    def test_new_generation(self):
+        self.other_process.set(self.manifest)
+        self.cache.get(None)
+
+        manifest = dict(self.manifest)
+        manifest['modules'] = [dict(self.manifest['modules'][0],
+                                    name='changed')]
+        self.other_process.set(manifest)
+        self.assertEqual([m.name for m in self.cache.get(None).modules],
+                         ['changed'])
+
+        cache.clear()
+        self.assertEqual(self.cache.get(None), None)
+
+
+class TestCacheStampede(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get(STYLEGUIDE_URL)
+        self.request.user = UserFactory(is_staff=True)
+
+        self.scans = []
+        phase_finished.connect(self.slow_scan)
+        self.addCleanup(phase_finished.disconnect, self.slow_scan)
+
+    def slow_scan(self, sender, phase, **kwargs):
+        if phase == 'scan':
+            self.scans.append(phase)
+            time.sleep(0.2)
+
+    def set_view_setting(self, name, value):
+        self.addCleanup(setattr, views, name, getattr(views, name))
+        setattr(views, name, value)
+
+    def test_single_rebuild(self):
+        results = []
+
+        def get_styleguide():
+            results.append(views.get_styleguide(self.request))
+
+        threads = [threading.Thread(target=get_styleguide)
+                   for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.scans), 1)
+        self.assertEqual([[m.name for m in styleguide.modules]
+                          for styleguide in results],
+                         [['components', 'layout']] * 5)
+        self.assertEqual(cache.get(STYLEGUIDE_CACHE_LOCK_KEY), None)
+
+    def test_stale_manifest_while_rebuilding(self):
+        self.set_view_setting('STYLEGUIDE_DEBUG', True)
+        self.set_view_setting('STYLEGUIDE_DEBUG_FINGERPRINT', True)
+
+        manifest = Styleguide().to_manifest()
+        manifest['fingerprint'] = 'old'
+        manifest['modules'][0]['name'] = 'stale'
+        cache.set(STYLEGUIDE_CACHE_KEY, manifest, None)
+        cache.add(STYLEGUIDE_CACHE_LOCK_KEY, 'other', 60)
+        self.scans = []
+
+        styleguide = views.get_styleguide(self.request)
+        self.assertEqual(styleguide.modules[0].name, 'stale')
+        self.assertEqual(self.scans, [])
+
+    def test_slow_rebuild_is_logged(self):
+        self.set_view_setting('STYLEGUIDE_REBUILD_LOCK_TIMEOUT', 0.3)
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger = logging.getLogger('styleguide')
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+        views.get_styleguide(self.request)
+        self.assertEqual([record.levelname for record in records],
+                         ['WARNING'])
+        self.assertIn('STYLEGUIDE_REBUILD_LOCK_TIMEOUT',
+                      records[0].getMessage())
+
+    def test_bounded_wait(self):
+        self.set_view_setting('STYLEGUIDE_REBUILD_WAIT', 0.1)
+        cache.add(STYLEGUIDE_CACHE_LOCK_KEY, 'other', 60)
+
+        styleguide = views.get_styleguide(self.request)
+        self.assertEqual([m.name for m in styleguide.modules],
+                         ['components', 'layout'])
+        self.assertEqual(len(self.scans), 1)
+        # The lock of the other process is left alone
+        self.assertEqual(cache.get(STYLEGUIDE_CACHE_LOCK_KEY), 'other')
+
+
+class TestLazyStyleguideCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(setattr, utils, 'STYLEGUIDE_LAZY',
+                        utils.STYLEGUIDE_LAZY)
+        utils.STYLEGUIDE_LAZY = True
+
+        user = UserFactory(is_staff=True)
+        self.client.login(username=user.username, password=USER_PASSWORD)
+
+        self.parsed = []
+        phase_finished.connect(self.receive_phase)
+        self.addCleanup(phase_finished.disconnect, self.receive_phase)
+
+    def receive_phase(self, sender, phase, duration, counts, **kwargs):
+        if phase == 'parse' and counts.get('files'):
+            self.parsed.append(counts['files'])
+
+    def test_loaded_modules_are_kept(self):
+        url = reverse('styleguide.module', kwargs={'module_name': 'layout'})
+        response = self.client.get(url)
+        self.assertContains(response, 'footer')
+        self.assertEqual(self.parsed, [3])
+
+        self.parsed = []
+        response = self.client.get(url)
+        self.assertContains(response, 'footer')
+        self.assertEqual(self.parsed, [])
+        # Rendering the components did not rebuild the graph per request
+        self.assertIs(styleguide_cache.get(None).get_dependency_graph(),
+                      styleguide_cache.get(None).get_dependency_graph())
+
+    def test_search_index_is_kept(self):
+        url = reverse('styleguide.search')
+        response = self.client.get(url, {'q': 'foot'})
+        self.assertContains(response, 'footer')
+        self.assertTrue(self.parsed)
+
+        self.parsed = []
+        response = self.client.get(url, {'q': 'head'})
+        self.assertContains(response, 'header')
+        self.assertEqual(self.parsed, [])
+        self.assertIs(styleguide_cache.get(None).get_search_index(),
+                      styleguide_cache.get(None).get_search_index())
+
+
+class TestServerTiming(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = UserFactory(is_staff=True)
+        self.client.login(username=user.username, password=USER_PASSWORD)
+
+        self.phases = []
+        phase_finished.connect(self.receive_phase)
+        self.addCleanup(phase_finished.disconnect, self.receive_phase)
+
+    def receive_phase(self, sender, phase, duration, counts, **kwargs):
+        self.phases.append((phase, counts))
+
+    def set_view_setting(self, name, value):
+        self.addCleanup(setattr, views, name, getattr(views, name))
+        setattr(views, name, value)
+
+    def test_phases_are_sent(self):
+        self.client.get(STYLEGUIDE_URL)
+        phases = dict(self.phases)
+
+        self.assertEqual(phases['cache_get'], {'miss': 1})
+        self.assertEqual(phases['scan']['files'], 5)
+        self.assertEqual(phases['parse']['files'], 5)
+        self.assertTrue(phases['parse']['size'] > 0)
+        for phase in ('links', 'cache_set', 'render'):
+            self.assertIn(phase, phases)
+
+        self.phases = []
+        self.client.get(STYLEGUIDE_URL)
+        phases = dict(self.phases)
+        self.assertEqual(phases['cache_get'], {'hit': 1, 'local': 1})
+        self.assertNotIn('scan', phases)
+
+    def test_header_is_opt_in(self):
+        response = self.client.get(STYLEGUIDE_URL)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+        self.set_view_setting('STYLEGUIDE_SERVER_TIMING', True)
+        response = self.client.get(STYLEGUIDE_URL)
+        self.assertTrue(response['Server-Timing'].startswith(
+            'cache_get;dur='))
+        self.assertIn('desc="hit=1 local=1"', response['Server-Timing'])
+        self.assertIn('render;dur=', response['Server-Timing'])
+
+    def test_streamed_render_is_partial(self):
+        self.set_view_setting('STYLEGUIDE_SERVER_TIMING', True)
+        self.set_view_setting('STYLEGUIDE_STREAMING', True)
+        response = self.client.get(STYLEGUIDE_URL)
+
+        self.assertTrue(response.streaming)
+        self.assertIn('desc="partial=1"', response['Server-Timing'])
+
+    def test_timings_are_summed_by_phase(self):
+        timings = Timings()
+        timings.add('parse', 1.5, {'files': 2})
+        timings.add('parse', 1, {'files': 1, 'size': 10})
+        timings.add('render', 2, {})
+
+        self.assertEqual(timings.to_header(),
+                         'parse;dur=2.50;desc="files=3 size=10", '
+                         'render;dur=2.00')
@@ -4,8 +4,13 @@ from django.conf.urls import patterns, url
 
 urlpatterns = patterns(
     'styleguide.views',
+    url(r'^components\.json$', 'components_json',
+        name="styleguide.components_json"),
+    url(r'^search/$', 'search', name="styleguide.search"),
     url(r'^(?P<module_name>\w+)\#(?P<component_name>\w+)', 'index',
         name="styleguide.component"),
-    url(r'^(?P<module_name>\w+)', 'index', name="styleguide.module"),
+    url(r'^(?P<module_name>\w+)/(?P<component_name>[\w.-]+)/$', 'component',
+        name="styleguide.component_page"),
+    url(r'^(?P<module_name>\w+)', 'module', name="styleguide.module"),
     url(r'', 'index', name="styleguide.index"),
 )
@@ -1,29 +1,49 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
+import io
+import json
 import os
 import re
+import threading
+from operator import attrgetter
 
 try:
     from collections import OrderedDict
 except ImportError:
     from ordereddict import OrderedDict
 
+try:
+    from os import scandir
+except ImportError:
+    # python < 3.5
+    from scandir import scandir
+
+try:
+    from concurrent import futures
+except ImportError:
+    # python 2 without the `futures` backport
+    futures = None
+
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.core.urlresolvers import reverse
-from django.template.defaulttags import CommentNode
+from django.utils.encoding import force_bytes, force_str, force_text
+from django.utils.http import RFC3986_SUBDELIMS
+from django.utils.six.moves.urllib.parse import quote
 
-try:
-    from django.template import Lexer, Parser
-    Engine = None
-except ImportError:
-    from django.template.base import Lexer, Parser
-    from django.template.engine import Engine
+from .dependencies import DependencyGraph, extract_dependencies
+from .instrumentation import measure
+from .manifest import ComponentManifest
+from .paths import PathFilter
+from .search import SearchIndex
 
 
 STYLEGUIDE_ACCESS = getattr(settings, 'STYLEGUIDE_ACCESS',
                             lambda user: user.is_staff or user.is_superuser)
 STYLEGUIDE_DEBUG = getattr(settings, 'STYLEGUIDE_DEBUG', settings.DEBUG)
+STYLEGUIDE_DEBUG_FINGERPRINT = getattr(settings,
+                                       'STYLEGUIDE_DEBUG_FINGERPRINT', False)
 STYLEGUIDE_CACHE_NAME = getattr(settings, 'STYLEGUIDE_CACHE_NAME',
                                 'styleguide_components')
 STYLEGUIDE_DIR_NAME = getattr(settings, 'STYLEGUIDE_DIR_NAME', 'styleguide')
@@ -31,37 +51,238 @@ STYLEGUIDE_IGNORE_FOLDERS = getattr(settings, 'STYLEGUIDE_IGNORE_FOLDERS',
                                     ('includes', ))
 STYLEGUIDE_DOCFILE_NAME = getattr(settings, 'STYLEGUIDE_DOCFILE_NAME',
                                   '__doc__.html')
+STYLEGUIDE_INCLUDE = getattr(settings, 'STYLEGUIDE_INCLUDE', ())
+STYLEGUIDE_EXCLUDE = getattr(settings, 'STYLEGUIDE_EXCLUDE', ())
+STYLEGUIDE_TEMPLATE_EXTENSIONS = getattr(
+    settings, 'STYLEGUIDE_TEMPLATE_EXTENSIONS', ('.html', ))
+STYLEGUIDE_MANIFEST_PATH = getattr(settings, 'STYLEGUIDE_MANIFEST_PATH', None)
+# Off by default: on a local disk whose files are in the page cache, the
+# pool does not beat a serial scan. It helps with cold or network-backed
+# trees, where reading the files dominates
+STYLEGUIDE_SCAN_WORKERS = getattr(settings, 'STYLEGUIDE_SCAN_WORKERS', None)
+STYLEGUIDE_SCAN_EXECUTOR = getattr(settings, 'STYLEGUIDE_SCAN_EXECUTOR',
+                                   'thread')
+STYLEGUIDE_LAZY = getattr(settings, 'STYLEGUIDE_LAZY', False)
+STYLEGUIDE_SERVER_TIMING = getattr(settings, 'STYLEGUIDE_SERVER_TIMING', False)
+STYLEGUIDE_STREAMING = getattr(settings, 'STYLEGUIDE_STREAMING', False)
+STYLEGUIDE_SEARCH_LIMIT = getattr(settings, 'STYLEGUIDE_SEARCH_LIMIT', 50)
+STYLEGUIDE_REBUILD_WAIT = getattr(settings, 'STYLEGUIDE_REBUILD_WAIT', 5)
+# Keep it well above the time a rebuild takes: the lock is released with
+# a get and a delete, which is not atomic
+STYLEGUIDE_REBUILD_LOCK_TIMEOUT = getattr(
+    settings, 'STYLEGUIDE_REBUILD_LOCK_TIMEOUT', 60)
 
 FILE_NAME_RE = re.compile('^\d{2}\-')
+COMMENT_START_RE = re.compile(r'\{%\s*comment(?:\s[^%]*)?%\}')
+COMMENT_END_RE = re.compile(r'\{%\s*endcomment\s*%\}')
+TAG_RE = re.compile(r'\{%\s*(\w+)')
+END_TAG_RE = re.compile(r'\{%\s*end(\w+)')
+
+# Bump it whenever the layout of `Styleguide.to_manifest` changes, so a
+# deploy does not read what the previous version cached
+CACHE_SCHEMA_VERSION = 7
+STYLEGUIDE_CACHE_KEY = '%s.v%s' % (STYLEGUIDE_CACHE_NAME, CACHE_SCHEMA_VERSION)
+# Held by the process which rebuilds the cached styleguide
+STYLEGUIDE_CACHE_LOCK_KEY = '%s.lock' % STYLEGUIDE_CACHE_KEY
+
+# Held while a lazy module is scanned, as loaders are not thread safe
+_load_lock = threading.Lock()
+
+# The pools of `StyleguideLoader._parse_files`, by (executor, workers), kept
+# for the life of the process rather than started for each scan
+_executors = {}
+_executors_lock = threading.Lock()
 
 
 class Styleguide(object):
     """Main class which is delivered to template"""
 
-    def __init__(self):
+    def __init__(self, lazy=None):
+        """
+        :lazy: When True, only the module folders are listed up front. Each
+        module is scanned the first time its components or doc are used.
+        Defaults to `STYLEGUIDE_LAZY`.
+        """
+        self.lazy = STYLEGUIDE_LAZY if lazy is None else lazy
         self._modules = None
         self._components = None
         self._items = None
+        self._module_index = None
         self.current_module = None
+        self.current_component = None
+        self.fingerprint = None
+        self.last_modified = None
+        self._etag = None
+        self._search_index = None
+        # dict(template name: dict), as stored by `to_manifest`
+        self._dependencies = None
         self._loader = StyleguideLoader()
 
     @property
     def modules(self):
-        if self._modules is None:
+        if self._modules is None and self.lazy:
             self._modules = []
+            links = LinkBuilder()
+            for name, path in self._loader.get_module_folders().items():
+                module_id = name.replace(' ', '_')
+                module = {
+                    'id': module_id,
+                    'name': name,
+                    'link': links.get_module_link(module_id),
+                }
+                self._modules.append(
+                    LazyStyleguideModule(module, self._loader, path))
+
+        elif self._modules is None:
+            self._modules = []
+            links = LinkBuilder()
             for name, data in self._loader.get_styleguide_components().items():
                 module_id = name.replace(' ', '_')
                 comps = [StyleguideComponent(c) for c in data['components']]
                 module = {
                     'id': module_id,
                     'name': name,
-                    'link': reverse("styleguide.module", args=(module_id, )),
-                    'components': comps
+                    'link': links.get_module_link(module_id),
+                    'components': comps,
+                    'doc': data['doc'],
                 }
                 self._modules.append(StyleguideModule(module))
 
+            self.last_modified = self._loader.scanned.get_last_modified()
+
         return self._modules
 
+    def to_manifest(self):
+        """
+        Returns the modules and components as plain dicts and lists, which
+        are cheap to cache, with their search index. Lazy modules not
+        scanned yet only keep their folder's path.
+        -> dict
+        """
+        modules = []
+        for module in self.modules:
+            data = {'id': module.id, 'name': module.name, 'link': module.link}
+
+            if isinstance(module, LazyStyleguideModule) and \
+                    not module.is_loaded():
+                data['path'] = module._path
+            else:
+                data['doc'] = module.doc
+                data['components'] = [c.to_dict() for c in module.components]
+
+            modules.append(data)
+
+        manifest = {
+            'lazy': self.lazy,
+            'fingerprint': self.fingerprint,
+            'last_modified': self.last_modified,
+            'modules': modules,
+            'search': None,
+            'dependencies': self.get_dependency_graph().to_dict(),
+        }
+        manifest['etag'] = self._etag = get_manifest_etag(manifest)
+
+        if not self.lazy:
+            self._search_index = SearchIndex.build(modules)
+            manifest['search'] = self._search_index.to_dict()
+
+        return manifest
+
+    @classmethod
+    def from_manifest(cls, manifest):
+        """ Rebuilds the styleguide returned by `to_manifest` """
+        styleguide = cls(lazy=manifest['lazy'])
+        styleguide.fingerprint = manifest['fingerprint']
+        styleguide.last_modified = manifest['last_modified']
+        styleguide._etag = manifest['etag']
+        styleguide._dependencies = manifest['dependencies']
+        if manifest['search'] is not None:
+            styleguide._search_index = SearchIndex.from_dict(
+                manifest['search'], manifest['modules'])
+        styleguide._modules = []
+
+        for data in manifest['modules']:
+            if 'path' in data:
+                module = LazyStyleguideModule(dict(data), styleguide._loader,
+                                              data['path'])
+            else:
+                module = dict(data)
+                module['components'] = [StyleguideComponent(c)
+                                        for c in data['components']]
+                module = StyleguideModule(module)
+
+            styleguide._modules.append(module)
+
+        return styleguide
+
+    def get_etag(self):
+        """
+        Changes whenever a module, a component, a doc or the mtime of a
+        styleguide file changes. Lazy styleguides have none, as they are
+        not scanned up front.
+        -> string or None
+        """
+        if self._etag is None and not self.lazy:
+            self.to_manifest()
+
+        return self._etag
+
+    def get_dependency_graph(self):
+        """
+        Which templates the components include or extend, and which
+        components use each template. Lazy styleguides only know the
+        modules scanned so far. Kept by the loader, which the copies of a
+        cached styleguide share, so it is built once rather than for each
+        request.
+        -> DependencyGraph
+        """
+        self.modules
+        scanned = self._loader.scanned
+
+        graph = self._loader.dependency_graph
+        if graph is None or graph[0] != len(scanned.templates):
+            templates = dict(self._dependencies or {})
+            templates.update(scanned.get_dependency_graph().templates)
+            # Templates are only ever added, so the count tells when a lazy
+            # module was scanned since
+            graph = (len(scanned.templates), DependencyGraph(templates))
+            self._loader.dependency_graph = graph
+
+        return graph[1]
+
+    def get_search_index(self):
+        """
+        Lazy styleguides scan all their modules to build it
+        -> SearchIndex
+        """
+        if self._search_index is None and not self.lazy:
+            self.to_manifest()
+
+        elif self._search_index is None:
+            # Kept by the loader, which the copies of a cached styleguide
+            # share, so it is only built once
+            if self._loader.search_index is None:
+                # Scans every module, so they are all in the manifest
+                self.components
+                self._loader.search_index = SearchIndex.build(
+                    self.to_manifest()['modules'])
+            self._search_index = self._loader.search_index
+
+        return self._search_index
+
+    def search(self, query, limit=None):
+        """
+        Returns the components matching the query, the best matches first
+        -> list((StyleguideModule, StyleguideComponent))
+        """
+        results = []
+        for module_id, component_id in \
+                self.get_search_index().search(query, limit):
+            module = self.get_module(module_id)
+            results.append((module, module.get_component(component_id)))
+
+        return results
+
     @property
     def components(self):
         if self._components is None:
@@ -77,11 +298,13 @@ class Styleguide(object):
         :deprecated:
         For retro compatibility only
         """
-        modules = OrderedDict()
-        for name, data in self._loader.get_styleguide_components().items():
-            modules[name] = data['components']
+        if self._items is None:
+            self._items = OrderedDict()
+            for module in self.modules:
+                self._items[module.name] = [c.to_dict()
+                                            for c in module.components]
 
-        return modules
+        return self._items
 
     @property
     def current_components(self):
@@ -90,12 +313,44 @@ class Styleguide(object):
         else:
             return self.current_module.components
 
+    def get_module(self, module_name):
+        """
+        Returns the module with the given id or name, or None
+        -> StyleguideModule
+        """
+        if self._module_index is None:
+            module_index = {}
+            for module in self.modules:
+                module_index[module.id] = module
+                module_index.setdefault(module.name, module)
+            self._module_index = module_index
+
+        return self._module_index.get(module_name)
+
+    def build_indexes(self):
+        """
+        Builds the module index, the component list and the dependency
+        graph up front, so that copies of the styleguide share them rather
+        than each building its own. Lazy modules are not scanned.
+        """
+        self.get_module(None)
+        self.get_dependency_graph()
+        if not self.lazy:
+            self.components
+            self.items
+
     def set_current_module(self, module_name):
         """ Sets the given module as the current one """
-        for module in self.modules:
-            if module.name == module_name:
-                self.current_module = module
-                break
+        self.current_module = self.get_module(module_name)
+        self.current_component = None
+
+    def set_current_component(self, module_name, component_name):
+        """ Sets the given module and one of its components as current """
+        self.set_current_module(module_name)
+
+        if self.current_module is not None:
+            self.current_component = \
+                self.current_module.get_component(component_name)
 
     def is_index(self):
         """ If a module is defined as current,
@@ -103,47 +358,261 @@ class Styleguide(object):
         return self.current_module is None
 
 
-class StyleguideComponent(dict):
+class StyleguideRecord(object):
+    """
+    Immutable data given to templates, keeping its fields in `__slots__`.
+    `fields` are the names returned by `to_dict`.
+    """
 
-    def __init__(self, data):
-        self._data = data
+    __slots__ = ()
+    fields = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % type(self).__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError("%s is immutable" % type(self).__name__)
+
+    def _set(self, name, value):
+        object.__setattr__(self, name, value)
 
     def __repr__(self):
-        return self._data.__str__()
+        return self.to_dict().__str__()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return type(self), (self.to_dict(), )
 
     def to_dict(self):
-        return self._data
+        return dict((field, getattr(self, field)) for field in self.fields)
 
-    @property
-    def id(self):
-        return self._data['id']
 
-    @property
-    def name(self):
-        return self._data['name']
+class StyleguideComponent(StyleguideRecord):
 
-    @property
-    def link(self):
-        return self._data['link']
+    __slots__ = ('id', 'name', 'file_name', 'template', 'doc', 'link',
+                 'page')
+    fields = __slots__
+
+    def __init__(self, data):
+        for field in self.fields:
+            self._set(field, data.get(field))
 
-    @property
-    def template(self):
-        return self._data['template']
+
+class StyleguideModule(StyleguideRecord):
+
+    __slots__ = ('id', 'name', 'link', '_doc', '_components',
+                 '_component_index')
+    fields = ('id', 'name', 'link', 'doc', 'components')
+
+    def __init__(self, data):
+        self._set('id', data['id'])
+        self._set('name', data['name'])
+        self._set('link', data['link'])
+        self._set('_doc', data.get('doc'))
+        self._set('_components', data.get('components'))
+        self._set('_component_index', None)
 
     @property
     def doc(self):
-        return self._data['doc']
+        return self._doc
+
+    @property
+    def components(self):
+        return self._components
+
+    def get_component(self, component_id):
+        """
+        Returns the component with the given id, or None
+        -> StyleguideComponent
+        """
+        if self._component_index is None:
+            component_index = {}
+            for component in self.components:
+                component_index.setdefault(component.id, component)
+            self._set('_component_index', component_index)
+
+        return self._component_index.get(component_id)
+
 
+class LazyStyleguideModule(StyleguideModule):
+    """ A module which scans its folder the first time it is needed """
 
-class StyleguideModule(StyleguideComponent):
+    __slots__ = ('_loader', '_path')
+
+    def __init__(self, data, loader, path):
+        super(LazyStyleguideModule, self).__init__(data)
+        self._set('_loader', loader)
+        self._set('_path', path)
+
+    def __reduce__(self):
+        data = {'id': self.id, 'name': self.name, 'link': self.link}
+        if self.is_loaded():
+            data['doc'] = self._doc
+            data['components'] = self._components
+
+        return type(self), (data, self._loader, self._path)
+
+    def is_loaded(self):
+        return self._components is not None
+
+    def _load(self):
+        if self.is_loaded():
+            return
+
+        # The copies of a cached styleguide share their modules, so
+        # concurrent requests could load the same one
+        with _load_lock:
+            if not self.is_loaded():
+                module = self._loader.get_module(self.name, self._path)
+                self._set('_doc', module['doc'])
+                self._set('_components', [StyleguideComponent(c)
+                                          for c in module['components']])
+
+    @property
+    def doc(self):
+        self._load()
+        return self._doc
 
     @property
     def components(self):
-        return self._data['components']
+        self._load()
+        return self._components
+
+
+class LinkBuilder(object):
+    """
+    Builds the links of modules and components like `reverse` does, but
+    reverses each url only once. Ids are quoted the same way `reverse`
+    quotes them, but they are not checked against the url patterns.
+    """
+
+    module_placeholder = 'styleguidemoduleplaceholder'
+    component_placeholder = 'styleguidecomponentplaceholder'
+    safe = RFC3986_SUBDELIMS + str('/~:@')
+
+    def __init__(self):
+        with measure('links', sender=LinkBuilder) as counts:
+            module_url = reverse("styleguide.module",
+                                 args=(self.module_placeholder, ))
+            component_url = reverse("styleguide.component",
+                                    args=(self.module_placeholder,
+                                          self.component_placeholder))
+            component_page_url = reverse("styleguide.component_page",
+                                         args=(self.module_placeholder,
+                                               self.component_placeholder))
+            counts['reversed'] = 3
+
+        # @see: http://stackoverflow.com/questions/11165267/django-redirect-with-anchor-parameters#comment57154035_22109798
+        component_url = component_url.replace('%23', '#')
+
+        self._quoted = {}
+        self._module_url = self._split(module_url)
+        self._component_url = self._split(component_url)
+        self._component_page_url = self._split(component_page_url)
+
+    def _split(self, url):
+        """ -> list of the url parts around the placeholders """
+        parts = []
+        for part in url.split(self.module_placeholder):
+            parts += part.split(self.component_placeholder)
+        return parts
+
+    def _quote(self, value):
+        if value not in self._quoted:
+            # django.utils.http.urlquote, without its lazy string wrapper
+            self._quoted[value] = force_text(quote(force_str(value),
+                                                   force_str(self.safe)))
+
+        return self._quoted[value]
+
+    def _join(self, parts, *ids):
+        url = parts[0]
+        for index, value in enumerate(ids):
+            url += self._quote(value) + parts[index + 1]
+        return url
+
+    def get_module_link(self, module_id):
+        """ -> reverse("styleguide.module", args=(module_id, )) """
+        return self._join(self._module_url, module_id)
+
+    def get_component_link(self, module_id, component_id):
+        """
+        -> reverse("styleguide.component", args=(module_id, component_id))
+        with the anchor not quoted
+        """
+        return self._join(self._component_url, module_id, component_id)
+
+    def get_component_page_link(self, module_id, component_id):
+        """
+        -> reverse("styleguide.component_page",
+                   args=(module_id, component_id))
+        """
+        return self._join(self._component_page_url, module_id, component_id)
 
 
 class StyleguideLoader(object):
 
+    def __init__(self, manifest_path=STYLEGUIDE_MANIFEST_PATH,
+                 workers=STYLEGUIDE_SCAN_WORKERS,
+                 executor=STYLEGUIDE_SCAN_EXECUTOR, path_filter=None):
+        """
+        :manifest_path: Where the component manifest is stored. When given,
+        docs of files which did not change since the manifest was built are
+        not parsed again, and if nothing changed at all the components are
+        read straight from it.
+        :workers: How many files are parsed at the same time while scanning
+        :executor: 'thread' or 'process', the kind of pool the files are
+        parsed in when `workers` is greater than one
+        :path_filter: The `PathFilter` of the folders and files to scan.
+        Defaults to the one of the `STYLEGUIDE_INCLUDE`, `STYLEGUIDE_EXCLUDE`
+        and `STYLEGUIDE_TEMPLATE_EXTENSIONS` settings
+        """
+        self.manifest_path = manifest_path
+        self.workers = workers
+        self.executor = executor
+        if path_filter is None:
+            path_filter = PathFilter(STYLEGUIDE_INCLUDE, STYLEGUIDE_EXCLUDE,
+                                     STYLEGUIDE_TEMPLATE_EXTENSIONS)
+        self.path_filter = path_filter
+        self._manifest = None
+        self._links = None
+        self._pending_docs = []
+        self._dependency_dirs = None
+        self.scanned = ComponentManifest()
+        self.parsed_files = 0
+        # Memoized by the styleguide, see `Styleguide.get_dependency_graph`
+        self.dependency_graph = None
+        # Built by lazy styleguides from all of their modules
+        self.search_index = None
+
+    def get_manifest(self):
+        """ Returns the stored manifest or None -> ComponentManifest """
+        if self._manifest is None and self.manifest_path:
+            self._manifest = ComponentManifest.load(self.manifest_path)
+
+        return self._manifest
+
+    def save_manifest(self):
+        """ Stores the result of the last scan in `manifest_path` """
+        self.scanned.save(self.manifest_path)
+        self._manifest = self.scanned
+
+    def _get_url_prefix(self):
+        return reverse("styleguide.index")
+
+    def _get_links(self):
+        if self._links is None:
+            self._links = LinkBuilder()
+
+        return self._links
+
     def _get_app_template_dirs(self):
         """
         Helper to get the `app_template_dirs` in different django versions
@@ -187,13 +656,53 @@ class StyleguideLoader(object):
 
         return tuple(styleguide_template_dirs)
 
+    def get_fingerprint(self):
+        """
+        Returns a hash of the mtime of every folder and the mtime and size of
+        every template in the styleguide folders. It changes whenever a
+        component is added, removed or edited, without reading any file.
+        Excluded folders are not entered, but the ones which are not scanned
+        for components, like `includes`, are: they hold the partials the
+        components use.
+        -> string
+        """
+        md5 = hashlib.md5()
+        path_filter = self.path_filter
+
+        for styleguide_template_dir in self._get_template_dirs():
+            for root, dirs, files in os.walk(styleguide_template_dir):
+                relative_root = os.path.relpath(root, styleguide_template_dir)
+                relative_root = '' if relative_root == os.curdir else \
+                    relative_root.replace(os.sep, '/') + '/'
+
+                # Pruned in place, so os.walk does not enter them
+                dirs[:] = sorted(
+                    name for name in dirs
+                    if not path_filter.is_excluded(relative_root + name))
+                files = sorted(
+                    name for name in files
+                    if path_filter.is_template(name) and
+                    not path_filter.is_excluded(relative_root + name))
+
+                stat = os.stat(root)
+                md5.update(force_bytes('%s %r\n' % (root, stat.st_mtime)))
+
+                for file_name in files:
+                    stat = os.stat(os.path.join(root, file_name))
+                    md5.update(force_bytes('%s %r %s\n' % (
+                        file_name, stat.st_mtime, stat.st_size)))
+
+        return md5.hexdigest()
+
     def get_styleguide_components(self):
         """
         Search for all templates files in `STYLEGUIDE_DIR_NAME` app_directories
         in all installed apps in the django project
 
         returns a dict with the folder name as the key and a list with all
-        template files in that folder.
+        template files in that folder. Only the folders right under
+        `STYLEGUIDE_DIR_NAME` are modules; the templates of their sub folders
+        belong to them. Modules and components are sorted alphabetically.
 
         for example, givin the following folder structure:
 
@@ -234,72 +743,220 @@ class StyleguideLoader(object):
 
         ret = OrderedDict()
         styleguide_template_dirs = self._get_template_dirs()
+        url_prefix = self._get_url_prefix()
 
-        for styleguide_template_dir in styleguide_template_dirs:
-            for root, dirs, files in os.walk(styleguide_template_dir):
-                # To make it walk alphabetically
-                dirs.sort()
+        options = self._get_scan_options()
 
-                for dir_name in dirs:
-                    if dir_name in STYLEGUIDE_IGNORE_FOLDERS:
-                        continue
+        manifest = self.get_manifest()
+        if manifest is not None and \
+                manifest.is_fresh(styleguide_template_dirs, url_prefix,
+                                  options):
+            self.scanned = manifest
+            return manifest.modules
+
+        self.scanned = ComponentManifest(roots=styleguide_template_dirs,
+                                         url_prefix=url_prefix, modules=ret,
+                                         options=options)
+        self.parsed_files = 0
+        self._links = LinkBuilder()
 
-                    components = self._get_components_from_folder(root,
-                                                                  dir_name)
+        with measure('scan', sender=StyleguideLoader) as counts:
+            for dir_name, (path, stat) in self._get_module_folders().items():
+                ret[dir_name] = self._build_module(dir_name, path, stat)
 
-                    ret[dir_name] = {
-                        'id': dir_name,
-                        'name': self._format_file_name(dir_name),
-                        'components': components,
-                        'link': 'styleguide/layout/',
-                        'doc': self._get_docfile_from_folder(root, dir_name),
-                    }
+            counts['dirs'] = len(self.scanned.dirs)
+            counts['files'] = len(self._pending_docs)
 
+        # All docs are read at once, so they can be parsed in parallel
+        self._load_pending_docs()
         return ret
 
-    def _get_components_from_folder(self, root, dir_name):
+    def _get_scan_options(self):
         """
-        :root: The whole path to the folder
-        :dir_name: The folder's name
+        The settings which change what a scan finds, so a manifest built
+        with other ones is not used as it is
+        -> dict
+        """
+        return {
+            'ignore_folders': sorted(STYLEGUIDE_IGNORE_FOLDERS),
+            'docfile_name': STYLEGUIDE_DOCFILE_NAME,
+            'path_filter': self.path_filter.to_dict(),
+        }
 
+    def get_module_folders(self):
+        """
+        Lists the modules without scanning them
+        -> OrderedDict(dir_name: path)
+        """
+        return OrderedDict((dir_name, path) for dir_name, (path, stat)
+                           in self._get_module_folders().items())
+
+    def get_module(self, dir_name, path):
+        """
+        Scans a single module, as returned by `get_styleguide_components`
+
+        :dir_name: The module's folder name
+        :path: The whole path to the module's folder
         -> dict
         """
+        with measure('scan', sender=StyleguideLoader) as counts:
+            dirs = len(self.scanned.dirs)
+            module = self._build_module(dir_name, path)
+            counts['dirs'] = len(self.scanned.dirs) - dirs
+            counts['files'] = len(self._pending_docs)
 
-        components = []
-        for root, dirs, files in os.walk(os.path.join(root, dir_name)):
-            # To make it walk alphabetically
-            files.sort()
+        self._load_pending_docs()
+        return module
 
-            for file_name in files:
-                if file_name == STYLEGUIDE_DOCFILE_NAME:
-                    # Do not process the doc file
-                    continue
+    def _get_module_folders(self):
+        """
+        The folders right under each styleguide dir, in alphabetical order.
+        When two styleguide dirs have the same folder, the last one wins.
+        -> OrderedDict(dir_name: (path, stat))
+        """
+        ret = OrderedDict()
+
+        for styleguide_template_dir in self._get_template_dirs():
+            folders, files = self._scan_folder(styleguide_template_dir)
 
-                if not file_name.endswith('.html'):
-                    # only template files
+            # The pages of the styleguide itself, like `index.html`, are
+            # kept for their mtime only
+            for entry in files:
+                self.scanned.add_file(entry.path, entry.stat(), None)
+
+            for entry in folders:
+                if entry.name in STYLEGUIDE_IGNORE_FOLDERS:
                     continue
 
-                doc = self.get_doc_from_file(os.path.join(root, file_name))
-                component_id = self._format_file_id(file_name)
-                template_path = os.path.join(STYLEGUIDE_DIR_NAME, dir_name,
-                                             file_name)
-                url = reverse("styleguide.component", args=(dir_name,
-                                                            component_id,))
-                url = url.replace('%23', '#')  # @see: http://stackoverflow.com/questions/11165267/django-redirect-with-anchor-parameters#comment57154035_22109798
-
-                component = {
-                    'id': component_id,
-                    'name': self._format_file_name(doc.get('name', file_name)),
-                    'file_name': file_name,
-                    'template': template_path,
-                    'doc': doc,
-                    'link': url
-                }
+                ret[entry.name] = (entry.path, entry.stat())
 
-                components.append(component)
+        return ret
 
+    def _build_module(self, dir_name, path, stat=None):
+        """
+        Scans the module's folder. Its docs are only read by
+        `_load_pending_docs`
+        -> dict
+        """
+        module = {
+            'id': dir_name,
+            'name': self._format_file_name(dir_name),
+            'components': [],
+            'link': 'styleguide/layout/',
+            'doc': {},
+        }
+
+        self._add_components_from_folder(module['components'], dir_name,
+                                         path, dir_name, stat)
+
+        path_to_doc_file = os.path.join(path, STYLEGUIDE_DOCFILE_NAME)
+        if os.path.isfile(path_to_doc_file):
+            self._pending_docs.append((path_to_doc_file, None, True, module))
+
+        return module
+
+    def _scan_folder(self, path, stat=None, relative_path=''):
+        """
+        Lists the given folder once, recording its mtime in `scanned`. The
+        folders and files `path_filter` does not allow are left out, so the
+        folders are not entered at all.
+
+        :path: The whole path to the folder
+        :stat: The folder's stat, when already known
+        :relative_path: The folder's path from the styleguide dir
+
+        -> (list(DirEntry), list(DirEntry)) folders and files, alphabetically
+        """
+        if stat is None:
+            stat = os.stat(path)
+        self.scanned.add_dir(path, stat)
+
+        prefix = ''
+        if relative_path:
+            prefix = relative_path.replace(os.sep, '/') + '/'
+
+        folders = []
+        files = []
+        for entry in scandir(path):
+            if entry.is_dir():
+                if self.path_filter.allows_folder(prefix + entry.name):
+                    folders.append(entry)
+            elif self.path_filter.allows_file(prefix + entry.name):
+                files.append(entry)
+
+        key = attrgetter('name')
+        return sorted(folders, key=key), sorted(files, key=key)
+
+    def _get_components_from_folder(self, root, dir_name, stat=None):
+        """
+        :root: The whole path to the folder
+        :dir_name: The folder's name
+        :stat: The folder's stat, when already known
+
+        Every template under the folder belongs to the module `dir_name`,
+        including the ones in sub folders, which are not modules themselves.
+        The files of a folder come first, then each sub folder in
+        alphabetical order. Folders in `STYLEGUIDE_IGNORE_FOLDERS` are skipped.
+
+        -> list(dict)
+        """
+
+        components = []
+        self._add_components_from_folder(components, dir_name,
+                                         os.path.join(root, dir_name),
+                                         dir_name, stat)
+        self._load_pending_docs()
         return components
 
+    def _add_components_from_folder(self, components, module_id, path,
+                                    relative_path, stat=None):
+        folders, files = self._scan_folder(path, stat, relative_path)
+
+        for entry in files:
+            file_name = entry.name
+            if file_name == STYLEGUIDE_DOCFILE_NAME:
+                # Do not process the doc file
+                continue
+
+            component_id = self._format_file_id(file_name)
+            # Components in sub folders are told apart by the folders,
+            # as their file names only need to be unique in a folder
+            sub_folders = relative_path.split(os.sep)[1:]
+            if sub_folders:
+                component_id = '-'.join(
+                    [folder.replace(' ', '-') for folder in sub_folders] +
+                    [component_id])
+            template_path = os.path.join(STYLEGUIDE_DIR_NAME, relative_path,
+                                         file_name)
+            links = self._get_links()
+            url = links.get_component_link(module_id, component_id)
+
+            # name and doc are set by `_load_pending_docs`
+            component = {
+                'id': component_id,
+                'name': None,
+                'file_name': file_name,
+                'template': template_path,
+                'doc': None,
+                'link': url,
+                'page': links.get_component_page_link(module_id,
+                                                      component_id),
+            }
+
+            components.append(component)
+            self._pending_docs.append((entry.path, entry.stat(), False,
+                                       component))
+
+        for entry in folders:
+            # Links to folders are not followed, like os.walk did, so a
+            # link to a parent folder can not recurse forever
+            if entry.name in STYLEGUIDE_IGNORE_FOLDERS or entry.is_symlink():
+                continue
+
+            self._add_components_from_folder(
+                components, module_id, entry.path,
+                os.path.join(relative_path, entry.name), entry.stat())
+
     def _get_docfile_from_folder(self, root, dir_name):
         """returns a dict with all doc from the given folder"""
         ret = {}
@@ -307,13 +964,206 @@ class StyleguideLoader(object):
                                         STYLEGUIDE_DOCFILE_NAME)
 
         if os.path.isfile(path_to_doc_file):
-            with open(path_to_doc_file) as docfile:
-                content = docfile.read()
-
-            ret = self.parse_doc(content)
+            ret = self._read_docs([(path_to_doc_file, None, True)])[0]
 
         return ret
 
+    def _load_pending_docs(self):
+        """
+        Reads the docs of the components and modules found by the scan,
+        completing their dicts
+        """
+        pending, self._pending_docs = self._pending_docs, []
+        docs = self._read_docs([(file_path, stat, is_docfile)
+                                for file_path, stat, is_docfile, _ in pending])
+
+        for (file_path, stat, is_docfile, data), doc in zip(pending, docs):
+            data['doc'] = doc
+            if not is_docfile:
+                data['name'] = self._format_file_name(
+                    doc.get('name', data['file_name']))
+
+        self._read_dependencies([(data['template'], file_path, stat, True)
+                                 for file_path, stat, is_docfile, data
+                                 in pending if not is_docfile])
+
+    def _read_docs(self, files):
+        """
+        :files: list of (file_path, stat, is_docfile) tuples. `stat` may be
+        None when not known yet
+
+        Parses the docs of the given files, in order, except the ones the
+        manifest already has for the very same file. With more than one
+        worker, they are parsed in a pool. The templates components include
+        or extend are found in the same read, and kept in `scanned`.
+
+        -> list(dict)
+        """
+        manifest = self.get_manifest()
+        files = [(file_path, os.stat(file_path) if stat is None else stat,
+                  is_docfile)
+                 for file_path, stat, is_docfile in files]
+
+        results = []
+        to_parse = []
+        for index, (file_path, stat, is_docfile) in enumerate(files):
+            doc = dependencies = None
+            if manifest is not None:
+                doc = manifest.get_doc(file_path, stat)
+                dependencies = manifest.get_dependencies(file_path, stat)
+
+            if doc is None or (dependencies is None and not is_docfile):
+                to_parse.append(index)
+
+            results.append((doc, dependencies))
+
+        with measure('parse', sender=StyleguideLoader) as counts:
+            parsed = self._parse_files(
+                [files[index][0] for index in to_parse],
+                [files[index][2] for index in to_parse])
+
+            counts['files'] = len(to_parse)
+            counts['cached'] = len(files) - len(to_parse)
+            # From the stat, not counted while reading
+            counts['size'] = sum(files[index][1].st_size
+                                 for index in to_parse)
+
+        for index, result in zip(to_parse, parsed):
+            results[index] = result
+        self.parsed_files += len(to_parse)
+
+        for (file_path, stat, is_docfile), (doc, dependencies) in \
+                zip(files, results):
+            self.scanned.add_file(file_path, stat, doc, dependencies)
+
+        return [doc for doc, dependencies in results]
+
+    def _read_dependencies(self, templates):
+        """
+        :templates: list of (template_name, file_path, stat, is_component)
+
+        Records in `scanned` the templates the given ones include or
+        extend, then the ones those templates use, and so on. The
+        dependencies of the components were found while parsing their doc,
+        other files are only read when the manifest does not have their
+        dependencies for the very same stat.
+        """
+        manifest = self.get_manifest()
+        pending = list(templates)
+        found = set(template[0] for template in templates)
+
+        with measure('dependencies', sender=StyleguideLoader) as counts:
+            counts['files'] = 0
+
+            while pending:
+                name, path, stat, is_component = pending.pop()
+                dependencies = self.scanned.get_dependencies(path, stat)
+                if dependencies is None and manifest is not None:
+                    dependencies = manifest.get_dependencies(path, stat)
+
+                if dependencies is None:
+                    dependencies = extract_dependencies(self._read_file(path))
+                    counts['files'] += 1
+
+                self.scanned.add_template(name, path, stat, dependencies,
+                                          is_component)
+
+                for dependency in dependencies:
+                    if dependency in found or \
+                            dependency in self.scanned.templates:
+                        continue
+
+                    found.add(dependency)
+
+                    dependency_path = self._find_template(dependency)
+                    if dependency_path is not None:
+                        pending.append((dependency, dependency_path,
+                                        os.stat(dependency_path), False))
+
+    def _find_template(self, template_name):
+        """ The path of the template or None if not found -> string """
+        for template_dir in self._get_dependency_dirs():
+            path = os.path.join(template_dir, template_name)
+            if os.path.isfile(path):
+                return path
+
+        return None
+
+    def _get_dependency_dirs(self):
+        """
+        Where the templates used by the components are looked for: the
+        folders holding the styleguide dirs first, then every other
+        template folder
+        -> list(string)
+        """
+        if self._dependency_dirs is None:
+            dirs = [os.path.dirname(styleguide_template_dir) for
+                    styleguide_template_dir in self._get_template_dirs()]
+
+            template_dirs = tuple(self._get_app_template_dirs())
+            template_dirs += tuple(getattr(settings, 'TEMPLATE_DIRS', ()))
+            for template_dir in template_dirs:
+                if template_dir not in dirs:
+                    dirs.append(template_dir)
+
+            self._dependency_dirs = dirs
+
+        return self._dependency_dirs
+
+    def _parse_files(self, file_paths, docfile_flags):
+        """
+        Returns the parsed docs and dependencies of the given files, in the
+        given order. With more than one worker, they are parsed in a pool.
+        -> list((dict, list))
+        """
+        if not self.workers or self.workers < 2 or not file_paths:
+            return list(map(self._parse_file, file_paths, docfile_flags))
+
+        if futures is None:
+            raise ImproperlyConfigured(
+                "STYLEGUIDE_SCAN_WORKERS needs the `futures` package "
+                "on python 2")
+
+        if self.executor == 'thread':
+            executor_class = futures.ThreadPoolExecutor
+            parse = self._parse_file
+        elif self.executor == 'process':
+            executor_class = futures.ProcessPoolExecutor
+            parse = parse_doc_file
+        else:
+            raise ImproperlyConfigured(
+                "STYLEGUIDE_SCAN_EXECUTOR must be 'thread' or 'process'")
+
+        key = (self.executor, self.workers)
+        with _executors_lock:
+            executor = _executors.get(key)
+            if executor is None:
+                executor = executor_class(max_workers=self.workers)
+                _executors[key] = executor
+
+        # Sends the files to the processes in a few batches
+        chunksize = max(1, len(file_paths) // (self.workers * 4))
+        return list(executor.map(parse, file_paths, docfile_flags,
+                                 chunksize=chunksize))
+
+    def _parse_file(self, file_path, is_docfile=False):
+        """
+        Returns the parsed doc of a component, with the templates it
+        includes or extends, from a single read. A module doc file, if
+        `is_docfile`, has no dependencies.
+        -> (dict, list or None)
+        """
+        source = self._read_file(file_path)
+        if is_docfile:
+            return self.parse_doc(source), None
+
+        return (self.parse_doc(self.extract_doc(source)),
+                extract_dependencies(source))
+
+    def _read_file(self, file_path):
+        with io.open(file_path, encoding=settings.FILE_CHARSET) as docfile:
+            return docfile.read()
+
     def _format_file_id(self, file_name):
         """returns a valid string which can be used in html id attribute"""
         return self._format_file_name(file_name).replace(' ', '-')
@@ -323,40 +1173,59 @@ class StyleguideLoader(object):
 
         # if the file_name startswith two digits, remove them
         file_name = FILE_NAME_RE.split(file_name)[-1]
-        return file_name.split('.html')[0].replace('_', ' ')
+        return self.path_filter.strip_extension(file_name).replace('_', ' ')
 
-    def get_doc_from_file(self, file_path):
+    def get_doc_from_file(self, file_path, stat=None):
         """
         :file_path: string
+        :stat: The file's stat, when already known
         -> dict
         """
 
-        doc_string = self.extract_doc_from_file(file_path)
-        return self.parse_doc(doc_string)
-
-    def extract_doc_from_file(self, file_path):
-        """ -> string """
+        return self._read_docs([(file_path, stat, False)])[0]
 
-        file_contents = open(file_path).read()
-        lexer = Lexer(file_contents)
-        tokens = lexer.tokenize()
-        if Engine is not None:
-            engine = Engine.get_default()
-            parser = Parser(lexer.tokenize(), engine.template_libraries, engine.template_builtins, origin=None)
-        else:
-            parser = Parser(lexer.tokenize())
+    def extract_doc(self, source):
+        """
+        Returns the contents of the first `{% comment %}` block of the source
+        which is not inside another block tag, like `{% if %}`. Block tags
+        are the ones closed by an `{% end... %}` tag somewhere in the source.
+        -> string
+        """
+        # Only looked for when a tag comes before the doc
+        block_tags = None
+        depth = 0
+        position = 0
+
+        while True:
+            tag = TAG_RE.search(source, position)
+            if tag is None:
+                return ''
+
+            name = tag.group(1)
+            if name == 'comment':
+                start = COMMENT_START_RE.match(source, tag.start())
+                if start is None:
+                    position = tag.end()
+                    continue
 
-        index = 0
-        result = ""
+                end = COMMENT_END_RE.search(source, start.end())
+                if end is None:
+                    return ''
+                if not depth:
+                    return source[start.end():end.start()].strip()
 
-        for node in parser.parse():
-            if isinstance(node, CommentNode):
-                result = tokens[index+1].contents.strip()
-                break
+                # The tags in a comment are not parsed
+                position = end.end()
+                continue
 
-            index += 1
+            if block_tags is None:
+                block_tags = set(END_TAG_RE.findall(source))
 
-        return result
+            if name.startswith('end'):
+                depth = max(depth - 1, 0)
+            elif name in block_tags:
+                depth += 1
+            position = tag.end()
 
     def parse_doc(self, doc):
         """
@@ -390,3 +1259,33 @@ class StyleguideLoader(object):
                 ret[current_tag] += "%s" % line
 
         return ret
+
+
+def get_manifest_etag(manifest):
+    """
+    :manifest: dict as returned by `Styleguide.to_manifest`
+    -> string or None for lazy manifests
+    """
+    if manifest['lazy']:
+        return None
+
+    data = [manifest['fingerprint'], manifest['last_modified'],
+            manifest['modules']]
+    return hashlib.md5(force_bytes(json.dumps(data, sort_keys=True))) \
+        .hexdigest()
+
+
+# The loader of a worker process, see `parse_doc_file`
+_parse_loader = None
+
+
+def parse_doc_file(file_path, is_docfile=False):
+    """
+    `StyleguideLoader._parse_file` as a plain function, so it can be sent
+    to a process pool. Each worker process builds its loader once.
+    """
+    global _parse_loader
+    if _parse_loader is None:
+        _parse_loader = StyleguideLoader()
+
+    return _parse_loader._parse_file(file_path, is_docfile)
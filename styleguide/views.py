@@ -1,28 +1,491 @@
 # -*- coding: utf-8 -*-
 
+import json
+import logging
+import time
+import uuid
+from functools import wraps
+from itertools import groupby, islice
+
 from django.core.cache import cache
 from django.shortcuts import render
-from django.http import Http404
-from styleguide.utils import (Styleguide, STYLEGUIDE_DIR_NAME,
-                              STYLEGUIDE_DEBUG, STYLEGUIDE_CACHE_NAME,
-                              STYLEGUIDE_ACCESS)
+from django.template import Context, loader
+from django.http import (Http404, HttpResponse, HttpResponseBadRequest,
+                         JsonResponse, StreamingHttpResponse)
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import force_bytes, force_text
+from django.utils.http import (http_date, quote_etag, urlsafe_base64_decode,
+                               urlsafe_base64_encode)
+from django.utils.safestring import mark_safe
+from styleguide.cache import styleguide_cache
+from styleguide.instrumentation import collect_timings, measure
+from styleguide.utils import (Styleguide, StyleguideLoader,
+                              STYLEGUIDE_DIR_NAME, STYLEGUIDE_DEBUG,
+                              STYLEGUIDE_DEBUG_FINGERPRINT,
+                              STYLEGUIDE_CACHE_LOCK_KEY,
+                              STYLEGUIDE_REBUILD_WAIT,
+                              STYLEGUIDE_REBUILD_LOCK_TIMEOUT,
+                              STYLEGUIDE_ACCESS,
+                              STYLEGUIDE_SERVER_TIMING, STYLEGUIDE_STREAMING,
+                              STYLEGUIDE_SEARCH_LIMIT)
+from styleguide.watcher import watcher
 
 
-def index(request, module_name=None, component_name=None):
+INDEX_TEMPLATE = "%s/index.html" % STYLEGUIDE_DIR_NAME
+MODULE_TEMPLATE = "%s/module.html" % STYLEGUIDE_DIR_NAME
+COMPONENT_TEMPLATE = "%s/component.html" % STYLEGUIDE_DIR_NAME
+SEARCH_TEMPLATE = "%s/search.html" % STYLEGUIDE_DIR_NAME
+INDEX_MODULE_TEMPLATE = "%s/index_module.html" % STYLEGUIDE_DIR_NAME
+MODULE_COMPONENT_TEMPLATE = "%s/module_component.html" % STYLEGUIDE_DIR_NAME
+
+# Rendered as `styleguide_sections` in the page, where the sections go
+# when it is streamed
+SECTIONS_MARKER = '<!-- styleguide sections -->'
+
+# How often the cache is checked while another process rebuilds it
+REBUILD_POLL_INTERVAL = 0.05
+
+logger = logging.getLogger('styleguide')
+
+
+def get_styleguide(request):
+    """
+    Returns the styleguide, from the cache when possible. Raises Http404 if
+    the user has no access to it.
+    """
     if not STYLEGUIDE_ACCESS(request.user):
         raise Http404()
 
-    styleguide = None
-    if not STYLEGUIDE_DEBUG:
-        styleguide = cache.get(STYLEGUIDE_CACHE_NAME)
+    manifest = watcher.manifest
+    if manifest is not None:
+        # Kept up to date by the watcher, so requests never scan
+        return Styleguide.from_manifest(manifest)
 
+    fingerprint = None
+    use_cache = not STYLEGUIDE_DEBUG
+
+    if STYLEGUIDE_DEBUG and STYLEGUIDE_DEBUG_FINGERPRINT:
+        # In debug mode, the cached styleguide is used while none of
+        # its files changed
+        with measure('fingerprint'):
+            fingerprint = StyleguideLoader().get_fingerprint()
+        use_cache = True
+
+    if not use_cache:
+        styleguide = Styleguide()
+        styleguide.fingerprint = fingerprint
+        return styleguide
+
+    styleguide = styleguide_cache.get(fingerprint)
     if styleguide is None:
+        styleguide = rebuild_styleguide(fingerprint)
+
+    return styleguide
+
+
+def rebuild_styleguide(fingerprint):
+    """
+    Scans the styleguide and caches it, one process at a time. While
+    another one holds the lock, the stale manifest is used if there is
+    one. Otherwise the new one is waited for, up to
+    `STYLEGUIDE_REBUILD_WAIT` seconds, before scanning anyway.
+    """
+    token = uuid.uuid4().hex
+
+    with measure('cache_lock') as counts:
+        locked = cache.add(STYLEGUIDE_CACHE_LOCK_KEY, token,
+                           STYLEGUIDE_REBUILD_LOCK_TIMEOUT)
+        counts['acquired' if locked else 'busy'] = 1
+
+    if not locked:
+        stale = styleguide_cache.get_manifest()
+        if stale is not None:
+            return Styleguide.from_manifest(stale)
+
+        styleguide = wait_for_styleguide(fingerprint)
+        if styleguide is not None:
+            return styleguide
+
+    started = time.time()
+    try:
         styleguide = Styleguide()
-        cache.set(STYLEGUIDE_CACHE_NAME, styleguide, None)
+        styleguide.fingerprint = fingerprint
+
+        # The manifest is built here, which scans the styleguide. The
+        # cached one is used from then on, so lazy modules loaded by this
+        # request are kept
+        styleguide = styleguide_cache.set(styleguide.to_manifest())
+    finally:
+        # Unless the lock expired and was taken by another process. The
+        # django cache has no atomic compare and delete, so if the lock
+        # expires between the two calls, the lock of the other process is
+        # deleted and a third one may rebuild at the same time. That only
+        # happens when a rebuild takes about `STYLEGUIDE_REBUILD_LOCK_TIMEOUT`
+        # seconds, which is why it is kept well above the time of a scan
+        if locked and cache.get(STYLEGUIDE_CACHE_LOCK_KEY) == token:
+            cache.delete(STYLEGUIDE_CACHE_LOCK_KEY)
+
+        elapsed = time.time() - started
+        if locked and elapsed > STYLEGUIDE_REBUILD_LOCK_TIMEOUT / 2.0:
+            logger.warning(
+                "Rebuilding the styleguide took %.1f s, close to "
+                "STYLEGUIDE_REBUILD_LOCK_TIMEOUT (%s s). Raise it, so "
+                "another process does not rebuild at the same time.",
+                elapsed, STYLEGUIDE_REBUILD_LOCK_TIMEOUT)
+
+    return styleguide
+
+
+def wait_for_styleguide(fingerprint):
+    """
+    Waits for another process to cache the styleguide with the given
+    fingerprint
+    -> Styleguide or None if it is not there after `STYLEGUIDE_REBUILD_WAIT`
+    """
+    with measure('cache_wait') as counts:
+        deadline = time.time() + STYLEGUIDE_REBUILD_WAIT
+
+        while time.time() < deadline:
+            time.sleep(REBUILD_POLL_INTERVAL)
+            styleguide = styleguide_cache.get(fingerprint)
+
+            if styleguide is not None:
+                counts['hit'] = 1
+                return styleguide
+
+        counts['timeout'] = 1
+
+
+def server_timing(view):
+    """
+    Collects the timings of the phases of the view. With
+    `STYLEGUIDE_SERVER_TIMING` they are sent in the `Server-Timing` header.
+    The header goes out before the body of a streamed response, so its
+    `render` phase only covers what was rendered up front, which is told
+    by a `partial` count.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with collect_timings() as timings:
+            response = view(request, *args, **kwargs)
+
+            if STYLEGUIDE_SERVER_TIMING:
+                if response.streaming and 'render' in timings.phases:
+                    timings.add('render', 0, {'partial': 1})
+                response['Server-Timing'] = timings.to_header()
+
+        return response
+
+    return wrapper
+
+
+def render_page(request, template_name, context, sections=None):
+    """
+    Renders the page, measured as the `render` phase. Answers 304 Not
+    Modified instead when the browser already has the current version of
+    the styleguide.
+
+    :sections: (template_name, iterable of contexts) With
+    `STYLEGUIDE_STREAMING`, the page is streamed: the html around
+    `styleguide_sections` first, then each section as it is rendered.
+    """
+    styleguide = context['styleguide']
+    etag = styleguide.get_etag()
+    last_modified = None
+    if styleguide.last_modified is not None:
+        last_modified = int(styleguide.last_modified)
+
+    if etag is not None:
+        response = get_conditional_response(request, etag=etag,
+                                            last_modified=last_modified)
+        if response is not None:
+            return response
+
+    if STYLEGUIDE_STREAMING and sections is not None:
+        response = stream_page(request, template_name, context, *sections)
+    else:
+        with measure('render'):
+            response = render(request, template_name, context)
+
+    if etag is not None:
+        response['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+
+    return response
+
+
+def stream_page(request, template_name, context, section_template_name,
+                section_contexts):
+    """
+    Returns a StreamingHttpResponse of the page with the sections in place
+    of `styleguide_sections`. A page which does not show them is returned
+    as it was rendered.
+    """
+    with measure('render'):
+        page = loader.render_to_string(
+            template_name,
+            dict(context, styleguide_sections=mark_safe(SECTIONS_MARKER)),
+            request=request)
+
+    if SECTIONS_MARKER not in page:
+        return HttpResponse(page)
+
+    head, tail = page.split(SECTIONS_MARKER, 1)
+    section_template = loader.get_template(section_template_name).template
+
+    # The context processors run once, rather than for every section
+    engine = section_template.engine
+    base_context = Context()
+    for processor in engine.template_context_processors:
+        base_context.update(processor(request))
+
+    def stream():
+        yield head
+
+        # Only one section is kept in memory at a time
+        for section_context in section_contexts:
+            with measure('render'):
+                with base_context.push(section_context):
+                    html = section_template.render(base_context)
+            yield html
+
+        yield tail
+
+    return StreamingHttpResponse(stream())
+
+
+def get_module_context(styleguide, module_name):
+    """
+    Sets the module as the current one and returns the context of its page.
+    Raises Http404 if there is no such module.
+    """
+    styleguide.set_current_module(module_name)
+
+    if styleguide.current_module is None:
+        raise Http404()
+
+    return {
+        'styleguide': styleguide,
+        'module': styleguide.current_module,
+    }
+
+
+def get_component_context(styleguide, module_name, component_name):
+    """
+    Sets the component as the current one and returns the context of its
+    page. Raises Http404 if there is no such component.
+    """
+    styleguide.set_current_component(module_name, component_name)
+
+    if styleguide.current_component is None:
+        raise Http404()
+
+    return {
+        'styleguide': styleguide,
+        'module': styleguide.current_module,
+        'component': styleguide.current_component,
+    }
+
+
+@server_timing
+def index(request, module_name=None, component_name=None):
+    # Kept for urls which still send modules and components to this view
+    if component_name is not None:
+        return component(request, module_name, component_name)
 
     if module_name is not None:
-        styleguide.set_current_module(module_name)
+        return module(request, module_name)
+
+    styleguide = get_styleguide(request)
 
     context = {'styleguide': styleguide}
-    index_path = "%s/index.html" % STYLEGUIDE_DIR_NAME
-    return render(request, index_path, context)
+    sections = (INDEX_MODULE_TEMPLATE,
+                ({'styleguide': styleguide, 'module': module}
+                 for module in styleguide.modules))
+    return render_page(request, INDEX_TEMPLATE, context, sections)
+
+
+@server_timing
+def module(request, module_name):
+    """ Renders the components of a single module """
+    styleguide = get_styleguide(request)
+    context = get_module_context(styleguide, module_name)
+    sections = (MODULE_COMPONENT_TEMPLATE,
+                (dict(context, component=component)
+                 for component in styleguide.current_components))
+    return render_page(request, MODULE_TEMPLATE, context, sections)
+
+
+@server_timing
+def component(request, module_name, component_name):
+    """ Renders a single component """
+    styleguide = get_styleguide(request)
+    context = get_component_context(styleguide, module_name, component_name)
+    return render_page(request, COMPONENT_TEMPLATE, context)
+
+
+@server_timing
+def search(request):
+    """ Lists the components matching the `q` parameter """
+    styleguide = get_styleguide(request)
+    query = request.GET.get('q', '').strip()
+
+    with measure('search') as counts:
+        results = []
+        if query:
+            results = styleguide.search(query, STYLEGUIDE_SEARCH_LIMIT)
+        counts['results'] = len(results)
+
+    context = {'styleguide': styleguide, 'query': query, 'results': results}
+    return render_page(request, SEARCH_TEMPLATE, context)
+
+
+def get_json_items(styleguide, module_ids, cursor=None):
+    """
+    Yields a `(module, None)` item for each module, followed by a
+    `(module, component)` item for each of its components, from the item
+    the cursor points to. The modules and components before it are
+    skipped without being walked, so lazy modules are not scanned.
+
+    :module_ids: Only the modules with these ids, or all when empty
+    :cursor: (module_id, component_id or None), as returned by
+    `decode_cursor`
+    """
+    modules = styleguide.modules
+    start = 0
+    skip = 0
+
+    if cursor is not None:
+        module_id, component_id = cursor
+        module = styleguide.get_module(module_id)
+        start = next(index for index, other in enumerate(modules)
+                     if other is module)
+
+        if component_id is not None:
+            component = module.get_component(component_id)
+            # The module item comes first
+            skip = 1 + next(index for index, other
+                            in enumerate(module.components)
+                            if other is component)
+
+    for module in islice(modules, start, None):
+        if module_ids and module.id not in module_ids:
+            continue
+
+        items = [None] + list(module.components)
+        for component in islice(items, skip, None):
+            yield module, component
+        skip = 0
+
+
+def group_json_items(items):
+    """ -> iterator of (module, list(components)) """
+    for module_id, module_items in groupby(items,
+                                           key=lambda item: item[0].id):
+        module_items = list(module_items)
+        yield module_items[0][0], [component for module, component
+                                   in module_items if component is not None]
+
+
+def get_module_json(module, components):
+    """ -> dict the module with the given components, for the json api """
+    return {
+        'id': module.id,
+        'name': module.name,
+        'link': module.link,
+        'doc': module.doc,
+        'components': [component.to_dict() for component in components],
+    }
+
+
+def stream_json(items):
+    """ Yields the json of the api one module at a time """
+    yield '{"modules": ['
+
+    for index, (module, components) in enumerate(group_json_items(items)):
+        if index:
+            yield ', '
+        yield json.dumps(get_module_json(module, components))
+
+    yield '], "next": null}'
+
+
+def encode_cursor(item):
+    module, component = item
+    component_id = None if component is None else component.id
+    return force_text(urlsafe_base64_encode(
+        force_bytes(json.dumps([module.id, component_id]))))
+
+
+def decode_cursor(styleguide, module_ids, cursor):
+    """
+    -> (module_id, component_id or None) Raises ValueError when the cursor
+    is invalid or points to nothing
+    """
+    cursor = json.loads(force_text(urlsafe_base64_decode(cursor)))
+    if not isinstance(cursor, list) or len(cursor) != 2:
+        raise ValueError("Invalid cursor")
+
+    module_id, component_id = cursor
+    module = styleguide.get_module(module_id)
+    if module is None or module.id != module_id or \
+            (module_ids and module_id not in module_ids):
+        raise ValueError("The cursor points to no module")
+
+    if component_id is not None and \
+            module.get_component(component_id) is None:
+        raise ValueError("The cursor points to no component")
+
+    return module_id, component_id
+
+
+@server_timing
+def components_json(request):
+    """
+    The modules and components as json. `module` keeps only the modules
+    with the given ids.
+
+    With `limit`, at most that many components are sent, along with the
+    `next` cursor to send as `cursor` for the following ones. A module cut
+    between two pages is sent again with its remaining components. Without
+    `limit`, the response is streamed one module at a time.
+    """
+    styleguide = get_styleguide(request)
+    module_ids = request.GET.getlist('module')
+    limit = request.GET.get('limit')
+    cursor = request.GET.get('cursor')
+
+    try:
+        if limit is not None:
+            limit = int(limit)
+            if limit < 1:
+                raise ValueError("The limit must be positive")
+
+        if cursor is not None:
+            cursor = decode_cursor(styleguide, module_ids, cursor)
+    except (ValueError, TypeError) as error:
+        return HttpResponseBadRequest(force_text(error))
+
+    items = get_json_items(styleguide, module_ids, cursor)
+
+    if limit is None:
+        return StreamingHttpResponse(stream_json(items),
+                                     content_type='application/json')
+
+    page = []
+    next_cursor = None
+    count = 0
+    for item in items:
+        if item[1] is not None:
+            if count == limit:
+                next_cursor = encode_cursor(item)
+                break
+            count += 1
+        page.append(item)
+
+    return JsonResponse({
+        'modules': [get_module_json(module, components)
+                    for module, components in group_json_items(page)],
+        'next': next_cursor,
+    })
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from timeit import default_timer
+
+from django.template import Engine
+
+from .instrumentation import measure
+from .utils import StyleguideLoader
+
+
+logger = logging.getLogger('styleguide')
+
+
+def warm_up(loader=None, engine=None):
+    """
+    Compiles the template of every component, so the first request finds
+    them in the cached template loader instead of compiling them, and
+    broken templates show up before any page is rendered.
+
+    :loader: The StyleguideLoader which lists the components
+    :engine: The template engine which renders the styleguide
+
+    -> list of (template_name, seconds, exception or None)
+    """
+    loader = loader if loader is not None else StyleguideLoader()
+    engine = engine if engine is not None else Engine.get_default()
+    results = []
+
+    with measure('warm_up') as counts:
+        for module in loader.get_styleguide_components().values():
+            for component in module['components']:
+                template_name = component['template']
+                error = None
+                start = default_timer()
+
+                try:
+                    engine.get_template(template_name)
+                except Exception as exception:
+                    error = exception
+                    logger.error("The template %s is broken: %s",
+                                 template_name, exception)
+
+                results.append((template_name, default_timer() - start,
+                                error))
+
+        counts['templates'] = len(results)
+        counts['errors'] = len([r for r in results if r[2] is not None])
+
+    return results
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+import atexit
+import copy
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+from .cache import styleguide_cache
+from .search import SearchIndex
+from .utils import (Styleguide, StyleguideLoader, get_manifest_etag,
+                    STYLEGUIDE_DEBUG, STYLEGUIDE_DEBUG_FINGERPRINT,
+                    STYLEGUIDE_DIR_NAME, STYLEGUIDE_DOCFILE_NAME)
+
+
+STYLEGUIDE_WATCH_INTERVAL = getattr(settings, 'STYLEGUIDE_WATCH_INTERVAL', 1)
+
+logger = logging.getLogger('styleguide')
+
+
+class StyleguideWatcher(object):
+    """
+    Keeps the manifest of the styleguide up to date from a background
+    thread, which polls the styleguide folders every `interval` seconds.
+
+    An edited template only has its own entry parsed and replaced. An
+    edited partial, which the components include or extend, is not parsed
+    at all: only its dependencies are read again, which changes the version
+    of the components using it. Added or removed files need a rescan, which
+    still only parses the files whose stat changed. Each new manifest is a
+    new dict, so the views can use `manifest` from any thread without
+    locking.
+    """
+
+    def __init__(self, interval=STYLEGUIDE_WATCH_INTERVAL, loader=None):
+        self.interval = interval
+        self.loader = loader if loader is not None else StyleguideLoader()
+        self.manifest = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """ Starts the thread, unless it is already running """
+        with self._lock:
+            if self.is_running():
+                return
+
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self.run,
+                                            name='styleguide-watcher')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """ Stops the thread and forgets the manifest """
+        with self._lock:
+            self._stopped.set()
+            if self.is_running() and \
+                    self._thread is not threading.current_thread():
+                self._thread.join(timeout)
+
+            self._thread = None
+            self.manifest = None
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception('The styleguide watcher failed to refresh')
+
+            self._stopped.wait(self.interval)
+
+    def refresh(self):
+        """
+        Brings the manifest up to date with the files
+        -> bool True when it changed
+        """
+        if self.manifest is None:
+            manifest = self._rescan()
+        else:
+            changed = self._get_changed_files()
+            if changed is not None and not changed:
+                return False
+
+            manifest = None
+            if changed is not None:
+                manifest = self._update_files(changed)
+
+            if manifest is None:
+                manifest = self._rescan()
+
+        if STYLEGUIDE_DEBUG and STYLEGUIDE_DEBUG_FINGERPRINT:
+            manifest['fingerprint'] = self.loader.get_fingerprint()
+
+        manifest['last_modified'] = self.loader.scanned.get_last_modified()
+        manifest['etag'] = get_manifest_etag(manifest)
+
+        self.manifest = manifest
+        styleguide_cache.set(manifest)
+        return True
+
+    def _get_changed_files(self):
+        """
+        The files modified since the last scan, or None when a file was
+        added or removed, which needs a rescan
+        -> list((path, stat)) or None
+        """
+        scanned = self.loader.scanned
+        changed = []
+
+        try:
+            for path, mtime in scanned.dirs.items():
+                if os.stat(path).st_mtime != mtime:
+                    return None
+
+            for path, entry in scanned.files.items():
+                stat = os.stat(path)
+                if entry['mtime'] != stat.st_mtime or \
+                        entry['size'] != stat.st_size:
+                    changed.append((path, stat))
+        except OSError:
+            return None
+
+        return changed
+
+    def _rescan(self):
+        """ -> dict manifest of a new scan """
+        styleguide = Styleguide(lazy=False)
+        styleguide._loader = self.loader
+        manifest = styleguide.to_manifest()
+
+        # The next rescan only parses the files whose stat changed
+        self.loader._manifest = self.loader.scanned
+        return manifest
+
+    def _update_files(self, changed):
+        """
+        Parses the docs of the changed files again and returns a copy of the
+        manifest with their entries replaced, or None if an entry can not
+        be found
+        -> dict
+        """
+        manifest = copy.deepcopy(self.manifest)
+        scanned = self.loader.scanned
+        templates = dict((template['path'], (name, template['component']))
+                         for name, template in scanned.templates.items())
+
+        # Partials and the pages of the styleguide have no doc
+        documented = [(path, stat) for path, stat in changed
+                      if scanned.files[path]['doc'] is not None]
+        docs = self.loader._read_docs([
+            (path, stat,
+             os.path.basename(path) == STYLEGUIDE_DOCFILE_NAME)
+            for path, stat in documented])
+
+        for (path, stat), doc in zip(documented, docs):
+            if not self._update_entry(manifest, path, doc):
+                return None
+
+        to_read = []
+        for path, stat in changed:
+            if path in templates:
+                name, is_component = templates[path]
+                to_read.append((name, path, stat, is_component))
+            elif scanned.files[path]['doc'] is None:
+                scanned.add_file(path, stat, None)
+
+        self.loader._read_dependencies(to_read)
+        graph = scanned.get_dependency_graph()
+        manifest['dependencies'] = graph.to_dict()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Components affected by the changed files: %s',
+                         ', '.join(graph.get_affected_components(
+                             path for path, stat in changed)))
+
+        if documented:
+            manifest['search'] = SearchIndex.build(
+                manifest['modules']).to_dict()
+
+        return manifest
+
+    def _update_entry(self, manifest, path, doc):
+        """ -> bool False when the file is not in the manifest """
+        for root in self.loader.scanned.roots:
+            relative_path = os.path.relpath(path, root)
+            if not relative_path.startswith(os.pardir):
+                break
+        else:
+            return False
+
+        dir_name = relative_path.split(os.sep)[0]
+        file_name = os.path.basename(path)
+        template = os.path.join(STYLEGUIDE_DIR_NAME, relative_path)
+
+        for module in manifest['modules']:
+            if module['name'] != dir_name:
+                continue
+
+            if relative_path == os.path.join(dir_name,
+                                             STYLEGUIDE_DOCFILE_NAME):
+                module['doc'] = doc
+                return True
+
+            for component in module['components']:
+                if component['template'] == template:
+                    component['doc'] = doc
+                    component['name'] = self.loader._format_file_name(
+                        doc.get('name', file_name))
+                    return True
+
+        return False
+
+
+watcher = StyleguideWatcher()
+
+
+def start_watcher():
+    """ Starts the shared watcher, stopped when the process exits """
+    watcher.start()
+    atexit.register(watcher.stop)